@@ -1,2 +1,11 @@
-from .celery import app as celery_app
+def __getattr__(name):
+    # Celery is loaded on first use (a worker, or the first task a web process
+    # enqueues via marketplace.tasks) instead of on every `import core`.
+    if name == "celery_app":
+        from .celery import app
+
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 __all__ = ("celery_app",)
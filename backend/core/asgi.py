@@ -2,6 +2,8 @@
 ASGI config for core project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with an ASGI server (gunicorn + uvicorn workers) so the long-lived
+Server-Sent Events feed at /api/events/ doesn't pin a worker per client.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -5,3 +5,6 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
 app = Celery("core")
 app.config_from_object("django.conf:settings", namespace="CELERY")
 app.autodiscover_tasks()
+
+# Queue-wait and runtime metrics (served at /api/ops/celery/).
+from . import celery_metrics  # noqa: E402,F401
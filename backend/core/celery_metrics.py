@@ -0,0 +1,144 @@
+import time
+
+from celery.signals import before_task_publish, task_failure, task_postrun, task_prerun, task_retry
+from django.conf import settings
+
+PREFIX = "celery:metrics"
+# Upper bounds in milliseconds; the last bucket catches everything slower.
+BUCKETS_MS = (10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000, 300000)
+
+_started = {}
+
+
+def _bucket(ms):
+    for bound in BUCKETS_MS:
+        if ms <= bound:
+            return str(bound)
+    return "inf"
+
+
+def _redis():
+    from marketplace.services.redis_client import get_redis
+
+    return get_redis()
+
+
+def _observe(pipe, key, ms):
+    pipe.hincrby(key, "count", 1)
+    pipe.hincrbyfloat(key, "sum_ms", ms)
+    pipe.hincrby(key, f"le_{_bucket(ms)}", 1)
+
+
+@before_task_publish.connect
+def _stamp(headers=None, **kwargs):
+    # Lets the worker measure how long the message sat in the queue.
+    if headers is not None:
+        headers.setdefault("sent_at", time.time())
+
+
+@task_prerun.connect
+def _start(task_id=None, task=None, **kwargs):
+    _started[task_id] = time.perf_counter()
+    sent_at = task.request.get("sent_at") or (task.request.headers or {}).get("sent_at")
+    queue = (task.request.delivery_info or {}).get("routing_key")
+    if sent_at and queue:
+        try:
+            pipe = _redis().pipeline(transaction=False)
+            _observe(pipe, f"{PREFIX}:wait:{queue}", max(0.0, (time.time() - float(sent_at)) * 1000))
+            pipe.execute()
+        except Exception:
+            pass  # metrics must never fail a task
+
+
+@task_postrun.connect
+def _finish(task_id=None, task=None, state=None, **kwargs):
+    started = _started.pop(task_id, None)
+    if started is None:
+        return
+    key = f"{PREFIX}:task:{task.name}"
+    try:
+        pipe = _redis().pipeline(transaction=False)
+        _observe(pipe, key, (time.perf_counter() - started) * 1000)
+        pipe.hincrby(key, f"state_{(state or 'UNKNOWN').lower()}", 1)
+        pipe.execute()
+    except Exception:
+        pass
+
+
+@task_retry.connect
+def _retried(sender=None, **kwargs):
+    try:
+        _redis().hincrby(f"{PREFIX}:task:{sender.name}", "retries", 1)
+    except Exception:
+        pass
+
+
+@task_failure.connect
+def _failed(sender=None, **kwargs):
+    try:
+        _redis().hincrby(f"{PREFIX}:task:{sender.name}", "failures", 1)
+    except Exception:
+        pass
+
+
+def _summarize(raw):
+    fields = {k.decode(): v.decode() for k, v in raw.items()}
+    count = int(fields.get("count", 0))
+    histogram, running = {}, 0
+    for bound in [str(b) for b in BUCKETS_MS] + ["inf"]:
+        running += int(fields.get(f"le_{bound}", 0))
+        histogram[bound] = running
+    summary = {
+        "count": count,
+        "mean_ms": round(float(fields.get("sum_ms", 0)) / count, 1) if count else None,
+        "histogram_ms": histogram,
+    }
+    # Percentiles are bucket upper bounds, i.e. "p95 is at most N ms".
+    for name, q in (("p50_ms", 0.5), ("p95_ms", 0.95), ("p99_ms", 0.99)):
+        summary[name] = next((bound for bound, seen in histogram.items() if count and seen >= q * count), None)
+    for name in ("retries", "failures"):
+        summary[name] = int(fields.get(name, 0))
+    summary["states"] = {k[6:]: int(v) for k, v in fields.items() if k.startswith("state_")}
+    return summary
+
+
+def queue_depths():
+    """
+    Waiting messages per queue from the broker, split by priority step (the
+    Redis transport keeps one list per step), plus delivered-but-unacked ones.
+    """
+    import redis
+
+    client = redis.Redis.from_url(settings.CELERY_BROKER_URL)
+    options = settings.CELERY_BROKER_TRANSPORT_OPTIONS
+    sep, steps = options["sep"], options["priority_steps"]
+    names = list(settings.CELERY_TASK_QUEUES)
+    pipe = client.pipeline(transaction=False)
+    for queue in names:
+        for step in steps:
+            pipe.llen(queue if step == 0 else f"{queue}{sep}{step}")
+    pipe.hlen("unacked")
+    counts = iter(pipe.execute())
+    queues = {}
+    for queue in names:
+        by_priority = {str(step): next(counts) for step in steps}
+        queues[queue] = {"depth": sum(by_priority.values()), "by_priority": by_priority}
+    return {"queues": queues, "unacked": next(counts)}
+
+
+def snapshot():
+    client = _redis()
+    tasks, waits = {}, {}
+    for key in client.scan_iter(match=f"{PREFIX}:*", count=500):
+        key = key.decode()
+        kind, _, name = key[len(PREFIX) + 1:].partition(":")
+        target = tasks if kind == "task" else waits
+        target[name] = _summarize(client.hgetall(key))
+    return {**queue_depths(), "queue_wait": waits, "tasks": dict(sorted(tasks.items()))}
+
+
+def reset():
+    client = _redis()
+    keys = list(client.scan_iter(match=f"{PREFIX}:*", count=500))
+    if keys:
+        client.delete(*keys)
@@ -0,0 +1,116 @@
+import zlib
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional encoder
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional encoder
+    zstandard = None
+
+
+class GzipEncoder:
+    def __init__(self, level):
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._obj.compress(data)
+
+    def flush(self):
+        return self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._obj.flush()
+
+
+class BrotliEncoder:
+    def __init__(self, level):
+        self._obj = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self._obj.process(data)
+
+    def flush(self):
+        return self._obj.flush()
+
+    def finish(self):
+        return self._obj.finish()
+
+
+class ZstdEncoder:
+    def __init__(self, level):
+        self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self._obj.compress(data)
+
+    def flush(self):
+        return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self._obj.flush()
+
+
+# Server preference when the client ranks several encodings equally.
+ENCODERS = {
+    name: encoder
+    for name, encoder, available in (
+        ("zstd", ZstdEncoder, zstandard is not None),
+        ("br", BrotliEncoder, brotli is not None),
+        ("gzip", GzipEncoder, True),
+    )
+    if available
+}
+
+
+def negotiate(accept_encoding, allowed):
+    """
+    Pick the encoding the client weights highest in Accept-Encoding (q-values,
+    ``*`` and ``;q=0`` refusals honoured), breaking ties by ENCODERS order.
+    """
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+    best, best_q = None, 0.0
+    for name in allowed:
+        q = weights.get(name, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def compress(encoding, level, data):
+    encoder = ENCODERS[encoding](level)
+    return encoder.compress(data) + encoder.finish()
+
+
+def compress_stream(encoding, level, chunks):
+    """Compress an iterator of chunks, flushing after each so streams stay live."""
+    encoder = ENCODERS[encoding](level)
+    for chunk in chunks:
+        data = encoder.compress(chunk) + encoder.flush()
+        if data:
+            yield data
+    yield encoder.finish()
+
+
+async def compress_async_stream(encoding, level, chunks):
+    encoder = ENCODERS[encoding](level)
+    async for chunk in chunks:
+        data = encoder.compress(chunk) + encoder.flush()
+        if data:
+            yield data
+    yield encoder.finish()
@@ -0,0 +1,79 @@
+import json
+import os
+import socket
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+WORKERS_KEY = "db:pool:workers"
+
+_lock = threading.Lock()
+_created = Counter()
+_started_at = time.time()
+_last_report = 0.0
+
+
+@receiver(connection_created)
+def _count_connection(sender, connection, **kwargs):
+    # Without a pool every new connection is churn; with one it's a pool refill.
+    with _lock:
+        _created[connection.alias] += 1
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def snapshot():
+    """Connection stats for this worker process, one entry per database alias."""
+    aliases = {}
+    for alias in settings.DATABASES:
+        wrapper = connections[alias]
+        pool = getattr(wrapper, "pool", None)
+        stats = {"connections_created": _created[alias]}
+        if pool is not None:
+            stats.update(pool.get_stats())
+        aliases[alias] = stats
+    return {
+        "worker": worker_id(),
+        "uptime_s": int(time.time() - _started_at),
+        "pooled": settings.DB_POOL,
+        "databases": aliases,
+        "reported_at": int(time.time()),
+    }
+
+
+@receiver(request_finished)
+def _report(sender, **kwargs):
+    """Publish this worker's stats to Redis at most every DB_POOL_REPORT_INTERVAL."""
+    global _last_report
+    now = time.monotonic()
+    if now - _last_report < settings.DB_POOL_REPORT_INTERVAL:
+        return
+    _last_report = now
+    from marketplace.services.redis_client import get_redis
+
+    try:
+        get_redis().hset(WORKERS_KEY, worker_id(), json.dumps(snapshot()))
+    except Exception:
+        pass  # metrics must never fail a request
+
+
+def all_workers(max_age=None):
+    """Latest reported stats from every worker that reported within ``max_age`` seconds."""
+    from marketplace.services.redis_client import get_redis
+
+    max_age = max_age or settings.DB_POOL_REPORT_INTERVAL * 6
+    cutoff = time.time() - max_age
+    client = get_redis()
+    reports = [json.loads(v) for v in client.hgetall(WORKERS_KEY).values()]
+    stale = [r["worker"] for r in reports if r["reported_at"] < cutoff]
+    if stale:
+        client.hdel(WORKERS_KEY, *stale)
+    return [r for r in reports if r["reported_at"] >= cutoff]
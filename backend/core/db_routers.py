@@ -0,0 +1,78 @@
+import contextvars
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+_replica_reads = contextvars.ContextVar("replica_reads", default=False)
+
+# alias -> (checked_at, healthy)
+_lag_checks = {}
+
+LAG_SQL = """
+SELECT CASE
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+END
+"""
+
+
+def allow_replica_reads(enabled=True):
+    """Route reads in the current request/task to replicas; returns a reset token."""
+    return _replica_reads.set(enabled)
+
+
+def reset_replica_reads(token):
+    _replica_reads.reset(token)
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith("replica")]
+
+
+def _replica_healthy(alias):
+    now = time.monotonic()
+    checked = _lag_checks.get(alias)
+    if checked and now - checked[0] < settings.REPLICA_LAG_CHECK_INTERVAL:
+        return checked[1]
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute(LAG_SQL)
+            lag = float(cursor.fetchone()[0])
+        healthy = lag <= settings.REPLICA_MAX_LAG_SECONDS
+        if not healthy:
+            logger.warning("Skipping replica %s: %.1fs behind primary", alias, lag)
+    except Exception:
+        logger.exception("Replica %s lag check failed", alias)
+        healthy = False
+    _lag_checks[alias] = (now, healthy)
+    return healthy
+
+
+class ReplicaRouter:
+    """
+    Sends reads to a healthy replica only when the request has opted in (see
+    core.middleware.ReplicaRoutingMiddleware) and we are not inside an atomic
+    block on the primary. Writes and migrations always use the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not _replica_reads.get():
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        healthy = [alias for alias in replica_aliases() if _replica_healthy(alias)]
+        return random.choice(healthy) if healthy else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
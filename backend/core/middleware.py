@@ -0,0 +1,214 @@
+import asyncio
+import hashlib
+import logging
+import random
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.models import Q
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework.exceptions import AuthenticationFailed
+
+from . import compression, profiling
+from .db_routers import allow_replica_reads, replica_aliases
+
+logger = logging.getLogger(__name__)
+
+
+def jwt_user_id(request):
+    """User id from a valid bearer token, without loading the user row."""
+    auth = JWTAuthentication()
+    header = auth.get_header(request)
+    if not header:
+        return None
+    try:
+        raw_token = auth.get_raw_token(header)
+        if raw_token is None:
+            return None
+        token = auth.get_validated_token(raw_token)
+    except (AuthenticationFailed, InvalidToken, TokenError):
+        return None
+    return token.get("user_id")
+
+
+def _pin_key(user_id):
+    return f"db:pin:{user_id}"
+
+
+class ReplicaRoutingMiddleware(MiddlewareMixin):
+    """
+    Lets safe requests to catalogue views (``replica_reads = True``) and list
+    endpoints read from replicas. A user who wrote recently is pinned to the
+    primary for REPLICA_PIN_SECONDS so they always read their own writes.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.enabled = bool(replica_aliases())
+
+    def process_response(self, request, response):
+        if not self.enabled:
+            return response
+        # Cleared outright rather than via a reset token: under ASGI the hooks
+        # run in separate contexts, and WSGI threads keep theirs between requests.
+        allow_replica_reads(False)
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            user_id = jwt_user_id(request)
+            if user_id:
+                cache.set(_pin_key(user_id), 1, timeout=settings.REPLICA_PIN_SECONDS)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not self.enabled or request.method not in SAFE_METHODS:
+            return None
+        view_class = getattr(view_func, "cls", None)
+        actions = getattr(view_func, "actions", None) or {}
+        eligible = getattr(view_class, "replica_reads", False) or (
+            actions.get(request.method.lower()) == "list"
+        )
+        if not eligible:
+            return None
+        user_id = jwt_user_id(request)
+        if user_id and cache.get(_pin_key(user_id)):
+            return None
+        allow_replica_reads()
+        return None
+
+
+_strong_etag = re.compile(r'^\s*"')
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Negotiates zstd, Brotli or gzip from Accept-Encoding for compressible
+    bodies of at least COMPRESSION_MIN_SIZE bytes; streaming responses are
+    compressed chunk by chunk. Paths in COMPRESSION_EXCLUDE_PATHS are never
+    compressed, so endpoints that echo secrets next to user input are not
+    exposed to BREACH. A view can set ``response.compression_cache_key`` to
+    keep the compressed bytes in the cache and compress a body only once.
+    """
+
+    def __init__(self, get_response):
+        if not settings.COMPRESSION_ENABLED:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        self.allowed = [e for e in settings.COMPRESSION_ENCODINGS if e in compression.ENCODERS]
+        self.exclude = [re.compile(pattern) for pattern in settings.COMPRESSION_EXCLUDE_PATHS]
+
+    def process_response(self, request, response):
+        encoding = self.choose_encoding(request, response)
+        if encoding is None:
+            return response
+        level = settings.COMPRESSION_LEVELS[encoding]
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = compression.compress_async_stream(
+                    encoding, level, response.streaming_content
+                )
+            else:
+                response.streaming_content = compression.compress_stream(
+                    encoding, level, response.streaming_content
+                )
+            del response["Content-Length"]
+        else:
+            compressed = self.compress_body(response, encoding, level)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+        etag = response.get("ETag")
+        if etag and _strong_etag.match(etag):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+    def choose_encoding(self, request, response):
+        patch_vary_headers(response, ("Accept-Encoding",))
+        if response.has_header("Content-Encoding") or response.status_code in (204, 304):
+            return None
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return None
+        content_type = response.get("Content-Type", "").split(";")[0].strip().lower()
+        if not content_type.startswith(tuple(settings.COMPRESSION_CONTENT_TYPES)):
+            return None
+        if any(pattern.search(request.path_info) for pattern in self.exclude):
+            return None
+        return compression.negotiate(request.META.get("HTTP_ACCEPT_ENCODING", ""), self.allowed)
+
+    def compress_body(self, response, encoding, level):
+        base = getattr(response, "compression_cache_key", None)
+        if not base:
+            return compression.compress(encoding, level, response.content)
+        # The body digest keeps a stale entry from being served if a view
+        # renders something different under the same key.
+        digest = hashlib.blake2b(response.content, digest_size=16).hexdigest()
+        key = f"{base}:{encoding}:{digest}"
+        compressed = cache.get(key)
+        if compressed is None:
+            compressed = compression.compress(encoding, level, response.content)
+            cache.set(key, compressed, timeout=settings.COMPRESSION_CACHE_TTL)
+        return compressed
+
+
+class ProfilingMiddleware(MiddlewareMixin):
+    """
+    Samples the stack and records the SQL of opted-in requests (see
+    core.profiling). A request is profiled when it carries a valid signed
+    ``X-Profile`` token, when a staff user adds ``?profile=1``, or at random
+    per PROFILER_SAMPLE_RATES for its URL name. Not installed at all unless
+    PROFILER_ENABLED, so it costs nothing when off.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILER_ENABLED:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def process_response(self, request, response):
+        profile = getattr(request, "_profile", None)
+        if profile is not None:
+            profile.stop(response.status_code)
+            try:
+                summary = profile.save()
+            except Exception:
+                logger.exception("Could not store profile %s", profile.id)
+            else:
+                response.headers["X-Profile-Id"] = summary["key"]
+        return response
+
+    def trigger(self, request):
+        token = request.headers.get("X-Profile")
+        if token and profiling.check_token(token):
+            return "token"
+        if request.GET.get("profile") == "1" and self.is_staff(request):
+            return "staff"
+        rate = settings.PROFILER_SAMPLE_RATES.get(request.resolver_match.url_name)
+        if rate and random.random() < rate:
+            return "sampled"
+        return None
+
+    def is_staff(self, request):
+        from marketplace.models import User
+
+        user_id = jwt_user_id(request)
+        if not user_id:
+            return False
+        return User.objects.filter(Q(is_staff=True) | Q(role="ops_admin"), pk=user_id).exists()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if asyncio.iscoroutinefunction(view_func):
+            return None
+        trigger = self.trigger(request)
+        if trigger is None:
+            return None
+        profile = profiling.Profile(request, trigger)
+        profile.url_name = request.resolver_match.url_name
+        profile.start()
+        request._profile = profile
+        return None
@@ -0,0 +1,185 @@
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from django.core.signing import BadSignature, TimestampSigner
+from django.db import connections
+from django.utils import timezone
+
+INDEX_KEY = "profiles:index"
+TOKEN_SALT = "core.profiling"
+SQL_FRAME_CHARS = 80
+
+
+def profile_storage():
+    return storages["profiles"]
+
+
+def issue_token(label="profile"):
+    """A token for the X-Profile header, valid for PROFILER_TOKEN_MAX_AGE seconds."""
+    return TimestampSigner(salt=TOKEN_SALT).sign(label)
+
+
+def check_token(token):
+    try:
+        TimestampSigner(salt=TOKEN_SALT).unsign(token, max_age=settings.PROFILER_TOKEN_MAX_AGE)
+    except BadSignature:
+        return False
+    return True
+
+
+_frame_names = {}
+
+
+def _frame_name(code):
+    name = _frame_names.get(code)
+    if name is None:
+        filename = code.co_filename
+        for root in sorted(sys.path, key=len, reverse=True):
+            if root and filename.startswith(root + os.sep):
+                filename = filename[len(root) + 1:]
+                break
+        name = _frame_names[code] = f"{getattr(code, 'co_qualname', code.co_name)} ({filename})"
+    return name
+
+
+class Sampler:
+    """
+    Samples one thread's stack every PROFILER_INTERVAL_MS from a background
+    thread and counts identical stacks, i.e. the collapsed format flame graph
+    tools read. While a query runs, its SQL is added as the leaf frame.
+    """
+
+    def __init__(self, thread_id):
+        self.thread_id = thread_id
+        self.interval = settings.PROFILER_INTERVAL_MS / 1000
+        self.counts = Counter()
+        self.current_sql = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame.f_code))
+                frame = frame.f_back
+            if not stack:
+                continue
+            stack.reverse()
+            sql = self.current_sql
+            if sql:
+                stack.append("[sql] " + " ".join(sql.split())[:SQL_FRAME_CHARS])
+            self.counts[";".join(stack)] += 1
+
+    def collapsed(self):
+        return "\n".join(f"{stack} {count}" for stack, count in self.counts.most_common())
+
+
+class Profile:
+    """One profiled request: stack samples plus every query it ran."""
+
+    def __init__(self, request, trigger):
+        self.id = uuid.uuid4().hex
+        self.trigger = trigger
+        self.method = request.method
+        self.path = request.path
+        self.url_name = None
+        self.started_at = timezone.now()
+        self.queries = []
+        self.sampler = Sampler(threading.get_ident())
+        self._stack = ExitStack()
+
+    def _record_sql(self, execute, sql, params, many, context):
+        self.sampler.current_sql = sql
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sampler.current_sql = None
+            if len(self.queries) < settings.PROFILER_MAX_QUERIES:
+                self.queries.append(
+                    {
+                        "alias": context["connection"].alias,
+                        "sql": sql,
+                        "many": many,
+                        "ms": round((time.perf_counter() - start) * 1000, 3),
+                    }
+                )
+
+    def start(self):
+        for alias in settings.DATABASES:
+            self._stack.enter_context(connections[alias].execute_wrapper(self._record_sql))
+        self._start = time.perf_counter()
+        self.sampler.start()
+
+    def stop(self, status_code):
+        self.duration_ms = round((time.perf_counter() - self._start) * 1000, 3)
+        self.sampler.stop()
+        self._stack.close()
+        self.status_code = status_code
+
+    def summary(self):
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "url_name": self.url_name,
+            "status": self.status_code,
+            "trigger": self.trigger,
+            "duration_ms": self.duration_ms,
+            "samples": sum(self.sampler.counts.values()),
+            "queries": len(self.queries),
+            "sql_ms": round(sum(q["ms"] for q in self.queries), 3),
+            "started_at": self.started_at.isoformat(),
+            "key": f"{self.started_at:%Y/%m/%d}/{self.id}",
+        }
+
+    def save(self):
+        """Write <key>.json (summary, SQL, stacks) and <key>.folded; index the summary."""
+        from marketplace.services.redis_client import get_redis
+
+        summary = self.summary()
+        stacks = self.sampler.collapsed()
+        document = {
+            **summary,
+            "interval_ms": settings.PROFILER_INTERVAL_MS,
+            "sql": self.queries,
+            "stacks": stacks,
+        }
+        storage = profile_storage()
+        storage.save(f"{summary['key']}.json", ContentFile(json.dumps(document).encode()))
+        storage.save(f"{summary['key']}.folded", ContentFile(stacks.encode()))
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.lpush(INDEX_KEY, json.dumps(summary))
+        pipe.ltrim(INDEX_KEY, 0, settings.PROFILER_INDEX_SIZE - 1)
+        pipe.execute()
+        return summary
+
+
+def recent_profiles(limit=100):
+    from marketplace.services.redis_client import get_redis
+
+    return [json.loads(raw) for raw in get_redis().lrange(INDEX_KEY, 0, limit - 1)]
+
+
+def open_profile(key, folded=False):
+    with profile_storage().open(f"{key}.{'folded' if folded else 'json'}", "rb") as fh:
+        data = fh.read()
+    return data.decode() if folded else json.loads(data)
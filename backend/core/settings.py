@@ -1,6 +1,6 @@
+import importlib.util
 import os
 from datetime import timedelta
-import django.db.backends.postgresql
 import environ
 from pathlib import Path
 import dj_database_url
@@ -17,22 +17,30 @@ INSTALLED_APPS = [
     "django.contrib.admin","django.contrib.auth","django.contrib.contenttypes",
     "django.contrib.sessions","django.contrib.messages","django.contrib.staticfiles",
     "django.contrib.gis",
-    "rest_framework","django_filters","storages","django_extensions",
+    "django.contrib.postgres",
+    "rest_framework","django_filters",
     "corsheaders",
     "marketplace",
     
 ]
 
+# Dev-only apps stay out of production processes (they add to every cold start).
+if env.bool("DEV_APPS", DEBUG):
+    INSTALLED_APPS.append("django_extensions")
+
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "core.middleware.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "core.middleware.ReplicaRoutingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "django.middleware.common.CommonMiddleware",
+    "core.middleware.ProfilingMiddleware",
 ]
 
 # Optional but useful:
@@ -102,6 +110,47 @@ else:
         }
     }
 
+# Read replicas: reads are routed here only for opted-in safe requests
+# (core.middleware.ReplicaRoutingMiddleware), never inside atomic blocks.
+for i, replica_url in enumerate(env.list("DATABASE_REPLICA_URLS", default=[])):
+    DATABASES[f"replica_{i}"] = dj_database_url.parse(
+        replica_url,
+        engine="django.contrib.gis.db.backends.postgis",
+    )
+DATABASE_ROUTERS = ["core.db_routers.ReplicaRouter"]
+
+# Connection reuse. With psycopg 3 installed each worker keeps a psycopg_pool
+# per alias (safe under ASGI, where persistent CONN_MAX_AGE connections are
+# not); otherwise fall back to persistent connections with health checks.
+# Set DB_PGBOUNCER when connecting through PgBouncer in transaction mode.
+DB_POOL = env.bool("DB_POOL", default=importlib.util.find_spec("psycopg_pool") is not None)
+DB_PGBOUNCER = env.bool("DB_PGBOUNCER", False)
+
+
+for db in DATABASES.values():
+    db.setdefault("OPTIONS", {})
+    if DB_POOL:
+        db["CONN_MAX_AGE"] = 0
+        db["OPTIONS"]["pool"] = {
+            "min_size": env.int("DB_POOL_MIN_SIZE", 2),
+            "max_size": env.int("DB_POOL_MAX_SIZE", 10),
+            "timeout": env.float("DB_POOL_TIMEOUT", 10.0),
+            "max_idle": env.float("DB_POOL_MAX_IDLE", 300.0),
+            "max_lifetime": env.float("DB_POOL_MAX_LIFETIME", 1800.0),
+        }
+    else:
+        db["CONN_MAX_AGE"] = env.int("DB_CONN_MAX_AGE", 60)
+    # With a pool, Django passes ConnectionPool.check_connection as the pool's
+    # checkout check; without one it pings reused persistent connections.
+    db["CONN_HEALTH_CHECKS"] = True
+    if DB_PGBOUNCER:
+        # Server-side cursors don't survive transaction pooling.
+        db["DISABLE_SERVER_SIDE_CURSORS"] = True
+DB_POOL_REPORT_INTERVAL = env.int("DB_POOL_REPORT_INTERVAL", 10)
+REPLICA_PIN_SECONDS = env.int("REPLICA_PIN_SECONDS", 10)
+REPLICA_MAX_LAG_SECONDS = env.float("REPLICA_MAX_LAG_SECONDS", 2.0)
+REPLICA_LAG_CHECK_INTERVAL = env.float("REPLICA_LAG_CHECK_INTERVAL", 5.0)
+
 
 
 
@@ -119,9 +168,34 @@ REST_FRAMEWORK = {
         "rest_framework.filters.SearchFilter",
         "rest_framework.filters.OrderingFilter",
     ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "marketplace.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "marketplace.renderers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+    # Trust only the edge proxy's X-Forwarded-For hop when identifying clients for throttling.
+    "NUM_PROXIES": env.int("NUM_PROXIES", 1),
+}
+
+# Redis token buckets per scope (marketplace.throttling); keys: ip, phone, user, endpoint.
+RATE_LIMITS = {
+    "login": {
+        "ip": env("RATE_LIMIT_LOGIN_IP", default="20/min"),
+        "phone": env("RATE_LIMIT_LOGIN_PHONE", default="5/min"),
+    },
+    "register": {"ip": env("RATE_LIMIT_REGISTER_IP", default="10/hour")},
+    "webhook": {
+        "ip": env("RATE_LIMIT_WEBHOOK_IP", default="600/min"),
+        "endpoint": env("RATE_LIMIT_WEBHOOK", default="3000/min"),
+    },
+    "search": {"ip": env("RATE_LIMIT_SEARCH_IP", default="120/min")},
+    "autocomplete": {"ip": env("RATE_LIMIT_AUTOCOMPLETE_IP", default="600/min")},
 }
 
-from datetime import timedelta
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=env.int("ACCESS_TOKEN_LIFETIME_MIN", 60)),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=env.int("REFRESH_TOKEN_LIFETIME_DAYS", 7)),
@@ -138,6 +212,7 @@ MEDIA_ROOT = BASE_DIR / "media"
 USE_S3 = env.bool("USE_S3", default=False)
 
 if USE_S3:
+    INSTALLED_APPS.append("storages")
     AWS_STORAGE_BUCKET_NAME = env("AWS_STORAGE_BUCKET_NAME")
     AWS_S3_REGION_NAME = env("AWS_S3_REGION_NAME", default="us-east-1")
     AWS_S3_ENDPOINT_URL = env("AWS_S3_ENDPOINT_URL", default="https://s3.amazonaws.com")
@@ -147,7 +222,247 @@ if USE_S3:
     AWS_ACCESS_KEY_ID = env("AWS_ACCESS_KEY_ID", default=None)
     AWS_SECRET_ACCESS_KEY = env("AWS_SECRET_ACCESS_KEY", default=None)
 
+    STORAGES = {
+        "default": {"BACKEND": "storages.backends.s3.S3Storage"},
+        "archive": {
+            "BACKEND": "storages.backends.s3.S3Storage",
+            "OPTIONS": {
+                "bucket_name": env("ARCHIVE_BUCKET_NAME", default=AWS_STORAGE_BUCKET_NAME),
+                "location": "archive",
+                "default_acl": "private",
+            },
+        },
+        "profiles": {
+            "BACKEND": "storages.backends.s3.S3Storage",
+            "OPTIONS": {
+                "bucket_name": env("PROFILES_BUCKET_NAME", default=AWS_STORAGE_BUCKET_NAME),
+                "location": "profiles",
+                "default_acl": "private",
+            },
+        },
+        "snapshots": {
+            "BACKEND": "core.storages.SnapshotStorage",
+            "OPTIONS": {
+                "bucket_name": env("SNAPSHOTS_BUCKET_NAME", default=AWS_STORAGE_BUCKET_NAME),
+                "location": "catalogue",
+                "default_acl": "public-read",
+                "querystring_auth": False,
+                "custom_domain": env("SNAPSHOTS_CUSTOM_DOMAIN", default=None),
+            },
+        },
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    }
+else:
+    STORAGES = {
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "archive": {
+            "BACKEND": "django.core.files.storage.FileSystemStorage",
+            "OPTIONS": {"location": env("ARCHIVE_ROOT", default=str(BASE_DIR / "archive"))},
+        },
+        "profiles": {
+            "BACKEND": "django.core.files.storage.FileSystemStorage",
+            "OPTIONS": {"location": env("PROFILES_ROOT", default=str(BASE_DIR / "profiles"))},
+        },
+        "snapshots": {
+            "BACKEND": "django.core.files.storage.FileSystemStorage",
+            "OPTIONS": {
+                "location": env("SNAPSHOTS_ROOT", default=str(BASE_DIR / "snapshots")),
+                "base_url": env("SNAPSHOTS_URL", default="/snapshots/"),
+                "allow_overwrite": True,
+            },
+        },
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    }
+
+# On-demand request profiling (core.profiling). Off unless PROFILER_ENABLED,
+# in which case the middleware only acts on requests that carry a signed
+# X-Profile token, ?profile=1 from staff, or a sampled URL name, e.g.
+# PROFILER_SAMPLE_RATES='{"seller-list": 0.01, "order-list": 0.05}'.
+PROFILER_ENABLED = env.bool("PROFILER_ENABLED", False)
+PROFILER_INTERVAL_MS = env.float("PROFILER_INTERVAL_MS", 5)
+PROFILER_SAMPLE_RATES = env.json("PROFILER_SAMPLE_RATES", default={})
+PROFILER_TOKEN_MAX_AGE = env.int("PROFILER_TOKEN_MAX_AGE", 60 * 60)
+PROFILER_INDEX_SIZE = env.int("PROFILER_INDEX_SIZE", 500)
+PROFILER_MAX_QUERIES = env.int("PROFILER_MAX_QUERIES", 2000)
+
+# Admin changelists switch from COUNT(*) to planner estimates above this many rows.
+ADMIN_ESTIMATED_COUNT_THRESHOLD = env.int("ADMIN_ESTIMATED_COUNT_THRESHOLD", 10000)
+
+# Monthly partitions (marketplace.services.partitions) and payload archival.
+PARTITION_MONTHS_AHEAD = env.int("PARTITION_MONTHS_AHEAD", 3)
+PAYMENT_ARCHIVE_AFTER_MONTHS = env.int("PAYMENT_ARCHIVE_AFTER_MONTHS", 3)
+
 
-# Celery
-CELERY_BROKER_URL = "redis://localhost:6379/0"
-CELERY_RESULT_BACKEND = "redis://localhost:6379/1"
+REDIS_URL = env("REDIS_URL", default="")
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+CATALOGUE_FACETS_TTL = env.int("CATALOGUE_FACETS_TTL", 15 * 60)
+
+# Static catalogue snapshots in the "snapshots" storage (marketplace.services.snapshots),
+# republished SNAPSHOT_PUBLISH_DELAY seconds after the first product change of a burst.
+SNAPSHOT_PUBLISH_DELAY = env.int("SNAPSHOT_PUBLISH_DELAY", 60)
+SNAPSHOT_PAGE_SIZE = env.int("SNAPSHOT_PAGE_SIZE", 100)
+SNAPSHOT_UPLOAD_WORKERS = env.int("SNAPSHOT_UPLOAD_WORKERS", 8)
+SNAPSHOT_UPLOAD_BATCH = env.int("SNAPSHOT_UPLOAD_BATCH", 200)
+SNAPSHOT_RETENTION = env.int("SNAPSHOT_RETENTION", 24 * 60 * 60)
+SNAPSHOT_LOCK_TIMEOUT = env.int("SNAPSHOT_LOCK_TIMEOUT", 30 * 60)
+SNAPSHOT_MANIFEST_MAX_AGE = env.int("SNAPSHOT_MANIFEST_MAX_AGE", 30)
+
+# Response compression (core.middleware.CompressionMiddleware). zstd and br
+# are used only when the zstandard / Brotli packages are installed.
+COMPRESSION_ENABLED = env.bool("COMPRESSION_ENABLED", True)
+COMPRESSION_ENCODINGS = env.list("COMPRESSION_ENCODINGS", default=["zstd", "br", "gzip"])
+COMPRESSION_LEVELS = {"zstd": 3, "br": 5, "gzip": 6}
+COMPRESSION_MIN_SIZE = env.int("COMPRESSION_MIN_SIZE", 860)
+COMPRESSION_CONTENT_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/",
+)
+# BREACH: never compress responses that carry secrets (tokens) alongside
+# request-controlled input. The SSE stream is excluded so proxies don't buffer it.
+COMPRESSION_EXCLUDE_PATHS = env.list(
+    "COMPRESSION_EXCLUDE_PATHS",
+    default=[r"^/api/auth/", r"^/api/seller-invitations/", r"^/api/events/"],
+)
+COMPRESSION_CACHE_TTL = env.int("COMPRESSION_CACHE_TTL", CATALOGUE_FACETS_TTL)
+SHIPPING_QUOTE_TTL = env.int("SHIPPING_QUOTE_TTL", 60 * 60)
+CART_TTL = env.int("CART_TTL", 14 * 24 * 60 * 60)
+# Product price/seller snapshots used by the cart; saves rewrite them, the TTL
+# bounds anything a missed signal (bulk UPDATE, raw SQL) leaves behind.
+CART_SNAPSHOT_TTL = env.int("CART_SNAPSHOT_TTL", 24 * 60 * 60)
+# How long a checkout holds the cart it took; a crashed checkout frees it then.
+CART_CHECKOUT_TIMEOUT = env.int("CART_CHECKOUT_TIMEOUT", 60)
+
+# /api/batch/ (marketplace.batch_views): sub-requests per call, threads for
+# concurrent GETs, and path prefixes that can't be batched.
+BATCH_MAX_REQUESTS = env.int("BATCH_MAX_REQUESTS", 20)
+BATCH_MAX_WORKERS = env.int("BATCH_MAX_WORKERS", 4)
+BATCH_EXCLUDE_PATHS = ("/api/batch/", "/api/auth/", "/api/events/", "/api/webhooks/")
+
+# Product autocomplete (marketplace.services.autocomplete).
+AUTOCOMPLETE_LIMIT = env.int("AUTOCOMPLETE_LIMIT", 8)
+AUTOCOMPLETE_MAX_LIMIT = 20
+AUTOCOMPLETE_CATEGORY_LIMIT = env.int("AUTOCOMPLETE_CATEGORY_LIMIT", 3)
+AUTOCOMPLETE_MIN_SIMILARITY = env.float("AUTOCOMPLETE_MIN_SIMILARITY", 0.4)
+AUTOCOMPLETE_POPULARITY_WEIGHT = env.float("AUTOCOMPLETE_POPULARITY_WEIGHT", 0.05)
+AUTOCOMPLETE_CACHE_TTL = env.int("AUTOCOMPLETE_CACHE_TTL", 10 * 60)
+AUTOCOMPLETE_LOCAL_CACHE_SIZE = env.int("AUTOCOMPLETE_LOCAL_CACHE_SIZE", 2048)
+
+# Delivery run planning (marketplace.services.dispatch). 32737 is UTM zone 37S,
+# which covers Dar es Salaam and most of the coast.
+DISPATCH_SRID = env.int("DISPATCH_SRID", 32737)
+DISPATCH_CLUSTER_RADIUS_M = env.float("DISPATCH_CLUSTER_RADIUS_M", 2500)
+DISPATCH_MAX_STOPS = env.int("DISPATCH_MAX_STOPS", 25)
+DISPATCH_TWO_OPT_PASSES = env.int("DISPATCH_TWO_OPT_PASSES", 20)
+
+# "Frequently bought together" mining (marketplace.services.recommendations).
+RECOMMENDATION_HALF_LIFE_DAYS = env.float("RECOMMENDATION_HALF_LIFE_DAYS", 90)
+RECOMMENDATION_KEEP = env.int("RECOMMENDATION_KEEP", 50)
+RECOMMENDATION_LIMIT = env.int("RECOMMENDATION_LIMIT", 12)
+RECOMMENDATION_MAX_BASKET = env.int("RECOMMENDATION_MAX_BASKET", 30)
+RECOMMENDATION_CHUNK_SIZE = env.int("RECOMMENDATION_CHUNK_SIZE", 1000)
+RECOMMENDATION_FLUSH_PAIRS = env.int("RECOMMENDATION_FLUSH_PAIRS", 50000)
+RECOMMENDATION_MINING_LAG = env.int("RECOMMENDATION_MINING_LAG", 5 * 60)
+RECOMMENDATION_CACHE_TTL = env.int("RECOMMENDATION_CACHE_TTL", 60 * 60)
+
+# Server-Sent Events (marketplace.streams); needs an ASGI server.
+EVENT_STREAM_MAXLEN = env.int("EVENT_STREAM_MAXLEN", 500)
+EVENT_STREAM_HEARTBEAT_MS = env.int("EVENT_STREAM_HEARTBEAT_MS", 15000)
+EVENT_STREAM_RETRY_MS = env.int("EVENT_STREAM_RETRY_MS", 1000)
+
+# Payment initiation runs in Celery (marketplace.tasks.initiate_payment), at most
+# PAYMENT_PROVIDER_CONCURRENCY operator calls in flight per provider unless
+# PAYMENT_PROVIDER_LIMITS (e.g. {"mpesa": 20}) says otherwise.
+PAYMENT_PROVIDER_CONCURRENCY = env.int("PAYMENT_PROVIDER_CONCURRENCY", 5)
+PAYMENT_PROVIDER_LIMITS = env.json("PAYMENT_PROVIDER_LIMITS", default={})
+PAYMENT_INITIATION_LEASE = env.int("PAYMENT_INITIATION_LEASE", 60)
+PAYMENT_INITIATION_TIMEOUT = env.int("PAYMENT_INITIATION_TIMEOUT", 5 * 60)
+PAYMENT_INITIATION_MAX_RETRIES = env.int("PAYMENT_INITIATION_MAX_RETRIES", 5)
+PAYMENT_INITIATION_BUSY_DELAY = env.float("PAYMENT_INITIATION_BUSY_DELAY", 2)
+# /api/payments/<id>/wait/ long-poll (ASGI), and how long resolved statuses stay in Redis.
+PAYMENT_WAIT_DEFAULT_TIMEOUT = env.int("PAYMENT_WAIT_DEFAULT_TIMEOUT", 25)
+PAYMENT_WAIT_MAX_TIMEOUT = env.int("PAYMENT_WAIT_MAX_TIMEOUT", 55)
+PAYMENT_STATUS_TTL = env.int("PAYMENT_STATUS_TTL", 15 * 60)
+
+# Notifications (marketplace.services.outbox)
+FRONTEND_URL = env("FRONTEND_URL", default="http://localhost:3000")
+EMAIL_BACKEND = env("EMAIL_BACKEND", default="django.core.mail.backends.console.EmailBackend")
+DEFAULT_FROM_EMAIL = env("DEFAULT_FROM_EMAIL", default="LMGa <no-reply@lmga.co.tz>")
+SMS_BACKEND = env("SMS_BACKEND", default="marketplace.services.notifications.ConsoleSMSBackend")
+OUTBOX_BATCH_SIZE = env.int("OUTBOX_BATCH_SIZE", 200)
+OUTBOX_MAX_BACKOFF = env.int("OUTBOX_MAX_BACKOFF", 15 * 60)
+OUTBOX_MAX_ATTEMPTS = env.int("OUTBOX_MAX_ATTEMPTS", 10)
+# How long a dispatcher holds claimed events before another may pick them up.
+OUTBOX_CLAIM_SECONDS = env.int("OUTBOX_CLAIM_SECONDS", 120)
+# POST /api/seller-invitations/bulk/ (JSON list or CSV upload).
+INVITATION_BULK_MAX_ROWS = env.int("INVITATION_BULK_MAX_ROWS", 1000)
+
+# Celery. Three queues so slow batch work can't hold up payments and
+# notifications; run a worker (or pool) per queue, e.g.
+#   celery -A core worker -Q critical -c 8
+#   celery -A core worker -Q default
+#   celery -A core worker -Q bulk -c 2
+CELERY_BROKER_URL = env("CELERY_BROKER_URL", default=REDIS_URL or "redis://localhost:6379/0")
+CELERY_RESULT_BACKEND = env("CELERY_RESULT_BACKEND", default=REDIS_URL or "redis://localhost:6379/1")
+# Plain names (Celery builds the kombu Queues) so settings don't import kombu.
+CELERY_TASK_QUEUES = {"critical": {}, "default": {}, "bulk": {}}
+CELERY_TASK_DEFAULT_QUEUE = "default"
+# On Redis a lower number is served first; messages are bucketed into these steps.
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    "priority_steps": [0, 3, 6, 9],
+    "sep": ":",
+    "queue_order_strategy": "priority",
+    # Must outlast the longest acks_late task or Redis redelivers it mid-run.
+    "visibility_timeout": env.int("CELERY_VISIBILITY_TIMEOUT", 3 * 60 * 60),
+}
+CELERY_TASK_DEFAULT_PRIORITY = 6
+CELERY_TASK_ROUTES = {
+    "marketplace.tasks.initiate_payment": {"queue": "critical", "priority": 0},
+    "marketplace.tasks.dispatch_outbox": {"queue": "critical", "priority": 3},
+    "marketplace.tasks.reconcile_payments": {"queue": "bulk"},
+    "marketplace.tasks.ensure_payment_partitions": {"queue": "bulk"},
+    "marketplace.tasks.archive_closed_payment_months": {"queue": "bulk"},
+    "marketplace.tasks.mine_recommendations": {"queue": "bulk"},
+    "marketplace.tasks.publish_catalogue_snapshots": {"queue": "bulk"},
+    # e.g. CELERY_EXTRA_ROUTES='{"marketplace.tasks.warm_product_facets": "bulk"}'
+    **{name: {"queue": queue} for name, queue in env.json("CELERY_EXTRA_ROUTES", default={}).items()},
+}
+# Long tasks: take one message at a time and acknowledge only after it finished,
+# so a crashed worker's task is redelivered rather than lost.
+CELERY_WORKER_PREFETCH_MULTIPLIER = env.int("CELERY_WORKER_PREFETCH_MULTIPLIER", 1)
+CELERY_TASK_ACKS_LATE = True
+CELERY_TASK_REJECT_ON_WORKER_LOST = True
+CELERY_BEAT_SCHEDULE = {
+    "dispatch-outbox": {
+        "task": "marketplace.tasks.dispatch_outbox",
+        "schedule": timedelta(seconds=5),
+    },
+    "ensure-payment-partitions": {
+        "task": "marketplace.tasks.ensure_payment_partitions",
+        "schedule": timedelta(days=1),
+    },
+    "archive-closed-payment-months": {
+        "task": "marketplace.tasks.archive_closed_payment_months",
+        "schedule": timedelta(days=1),
+    },
+    "mine-recommendations": {
+        "task": "marketplace.tasks.mine_recommendations",
+        "schedule": timedelta(minutes=env.int("RECOMMENDATION_MINING_MINUTES", 15)),
+    },
+}
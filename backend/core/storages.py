@@ -0,0 +1,19 @@
+from django.conf import settings
+from storages.backends.s3 import S3Storage
+
+
+class SnapshotStorage(S3Storage):
+    """
+    Catalogue snapshots (marketplace.services.snapshots). Everything but the
+    manifest is content-addressed and never changes, so it can be cached
+    for good; the manifest gets a short max-age.
+    """
+
+    def get_object_parameters(self, name):
+        params = super().get_object_parameters(name)
+        params["ContentType"] = "application/json"
+        if name.rsplit("/", 1)[-1] == "manifest.json":
+            params["CacheControl"] = f"public, max-age={settings.SNAPSHOT_MANIFEST_MAX_AGE}"
+        else:
+            params["CacheControl"] = "public, max-age=31536000, immutable"
+        return params
@@ -8,9 +8,15 @@ from marketplace.views import (
     OrderViewSet,
     PaymentViewSet,
     SellerInvitationViewSet,
+    CartViewSet,
+    DeliveryRunViewSet,
     payment_webhook,
+    shipping_quote,
 )
 from marketplace.auth_views import register, login
+from marketplace.streams import order_events, payment_wait
+from marketplace.ops_views import celery_stats, db_pool_stats, profile_detail, profile_token, profiles
+from marketplace.batch_views import batch
 from rest_framework_simplejwt.views import TokenRefreshView
 
 router = DefaultRouter()
@@ -19,6 +25,8 @@ router.register(r"products", ProductViewSet, basename="product")
 router.register(r"orders", OrderViewSet, basename="order")
 router.register(r"payments", PaymentViewSet, basename="payment")
 router.register(r"seller-invitations", SellerInvitationViewSet, basename="seller-invitation")
+router.register(r"cart", CartViewSet, basename="cart")
+router.register(r"delivery-runs", DeliveryRunViewSet, basename="delivery-run")
 
 def health_check(request):
     return JsonResponse({"status": "ok"})
@@ -30,5 +38,14 @@ urlpatterns = [
     path("api/auth/login/", login),
     path("api/auth/refresh/", TokenRefreshView.as_view(), name="token-refresh"),
     path("api/webhooks/payments/", payment_webhook, name="payment-webhook"),
+    path("api/shipping/quote/", shipping_quote, name="shipping-quote"),
+    path("api/events/", order_events, name="order-events"),
+    path("api/payments/<uuid:payment_id>/wait/", payment_wait, name="payment-wait"),
+    path("api/ops/db-pool/", db_pool_stats, name="ops-db-pool"),
+    path("api/ops/celery/", celery_stats, name="ops-celery"),
+    path("api/ops/profiles/", profiles, name="ops-profiles"),
+    path("api/ops/profiles/token/", profile_token, name="ops-profile-token"),
+    path("api/ops/profiles/<path:key>/", profile_detail, name="ops-profile-detail"),
+    path("api/batch/", batch, name="batch"),
     path("api/", include(router.urls)),
 ]
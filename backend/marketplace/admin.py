@@ -1,3 +1,207 @@
+import json
+
+from django.conf import settings
 from django.contrib import admin
-from .models import User, Seller, Product, Order, OrderItem, Payment, Invoice
-admin.site.register([User, Seller, Product, Order, OrderItem, Payment, Invoice])
+from django.contrib.gis.admin import GISModelAdmin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+from .models import (
+    User,
+    Seller,
+    SellerUser,
+    SellerInvitation,
+    Product,
+    Order,
+    OrderItem,
+    DeliveryRun,
+    Payment,
+    PaymentArchive,
+    Invoice,
+    ShippingZone,
+    OutboxEvent,
+    ProductAffinity,
+    JobCursor,
+)
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Uses the planner's row estimate instead of COUNT(*) once a changelist is
+    large: pg_class.reltuples for an unfiltered table (summed over partitions),
+    EXPLAIN's top-level row estimate for a filtered one. Small results still
+    get an exact count, so short filtered lists page correctly.
+    """
+
+    @cached_property
+    def count(self):
+        try:
+            estimate = self._estimate()
+        except Exception:
+            estimate = None
+        if estimate is None or estimate < settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+            return super().count
+        return estimate
+
+    def _estimate(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        with connection.cursor() as cursor:
+            if not queryset.query.where:
+                cursor.execute(
+                    """
+                    SELECT COALESCE(SUM(GREATEST(c.reltuples, 0)), 0)::bigint
+                    FROM pg_class c
+                    WHERE c.oid = %s::regclass
+                       OR c.oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = %s::regclass)
+                    """,
+                    [queryset.model._meta.db_table] * 2,
+                )
+                return cursor.fetchone()[0]
+            sql, params = queryset.order_by().query.sql_with_params()
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Changelist defaults for tables that grow without bound. Filters are limited
+    to choice/boolean fields: Django renders those from the field definition,
+    while a filter on a free-text column runs SELECT DISTINCT over the table.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+
+class OrderItemInline(admin.TabularInline):
+    model = OrderItem
+    raw_id_fields = ("product",)
+    extra = 0
+
+
+@admin.register(Order)
+class OrderAdmin(LargeTableAdmin):
+    list_display = ("id", "buyer", "seller", "status", "total", "delivery_method", "created_at")
+    list_filter = ("status",)
+    list_select_related = ("buyer", "seller")
+    raw_id_fields = ("buyer", "seller", "delivery_run")
+    search_fields = ("=buyer__phone",)
+    ordering = ("-created_at",)
+    inlines = [OrderItemInline]
+
+
+@admin.register(Payment)
+class PaymentAdmin(LargeTableAdmin):
+    list_display = ("id", "order", "provider", "method", "amount", "status", "tx_ref", "created_at")
+    list_filter = ("status",)
+    list_select_related = ("order",)
+    raw_id_fields = ("order",)
+    search_fields = ("=tx_ref",)
+    ordering = ("-created_at",)
+
+
+@admin.register(Product)
+class ProductAdmin(LargeTableAdmin):
+    list_display = ("name", "category", "brand", "seller", "price", "stock", "created_at")
+    list_select_related = ("seller",)
+    raw_id_fields = ("seller",)
+    search_fields = ("name", "brand")
+    ordering = ("-created_at",)
+
+
+class SellerUserInline(admin.TabularInline):
+    model = SellerUser
+    fk_name = "seller"
+    raw_id_fields = ("user", "invited_by")
+    extra = 0
+
+
+@admin.register(Seller)
+class SellerAdmin(LargeTableAdmin):
+    list_display = ("business_name", "user", "phone", "verified", "created_at")
+    list_filter = ("verified",)
+    list_select_related = ("user",)
+    raw_id_fields = ("user",)
+    search_fields = ("business_name", "=phone")
+    ordering = ("-created_at",)
+    inlines = [SellerUserInline]
+
+
+@admin.register(SellerInvitation)
+class SellerInvitationAdmin(LargeTableAdmin):
+    list_display = ("email", "phone", "seller", "role", "status", "invited_by", "created_at")
+    list_filter = ("status", "role")
+    list_select_related = ("seller", "invited_by")
+    raw_id_fields = ("seller", "invited_by")
+    search_fields = ("=email", "=phone")
+    ordering = ("-created_at",)
+
+
+@admin.register(User)
+class UserAdmin(LargeTableAdmin):
+    list_display = ("full_name", "phone", "email", "role", "is_active", "created_at")
+    list_filter = ("role", "is_active")
+    search_fields = ("=phone", "=email")
+
+
+@admin.register(OrderItem)
+class OrderItemAdmin(LargeTableAdmin):
+    list_display = ("id", "order", "product", "quantity", "unit_price", "line_total")
+    list_select_related = ("order", "product")
+    raw_id_fields = ("order", "product")
+
+
+@admin.register(Invoice)
+class InvoiceAdmin(LargeTableAdmin):
+    list_display = ("invoice_no", "order", "fiscal_status", "created_at")
+    list_select_related = ("order",)
+    raw_id_fields = ("order",)
+    search_fields = ("=invoice_no",)
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(LargeTableAdmin):
+    list_display = ("id", "kind", "channel", "recipient", "attempts", "sent_at", "failed_at", "created_at")
+    list_filter = ("channel", ("failed_at", admin.EmptyFieldListFilter))
+    search_fields = ("=recipient",)
+    ordering = ("-id",)
+
+
+@admin.register(PaymentArchive)
+class PaymentArchiveAdmin(admin.ModelAdmin):
+    list_display = ("month", "row_count", "size_bytes", "storage_key", "created_at")
+    ordering = ("-month",)
+
+
+@admin.register(ShippingZone)
+class ShippingZoneAdmin(GISModelAdmin):
+    list_display = ("name", "base_fee", "per_km_fee", "per_kg_fee", "is_active")
+    list_filter = ("is_active",)
+
+
+@admin.register(ProductAffinity)
+class ProductAffinityAdmin(LargeTableAdmin):
+    list_display = ("product", "related", "score", "updated_at")
+    list_select_related = ("product", "related")
+    raw_id_fields = ("product", "related")
+    ordering = ("product", "-score")
+
+
+@admin.register(JobCursor)
+class JobCursorAdmin(admin.ModelAdmin):
+    list_display = ("name", "position", "updated_at")
+
+
+@admin.register(DeliveryRun)
+class DeliveryRunAdmin(LargeTableAdmin):
+    list_display = ("id", "seller", "date", "status", "stop_count", "distance_km", "dispatched_at")
+    list_filter = ("status",)
+    list_select_related = ("seller",)
+    raw_id_fields = ("seller",)
+    ordering = ("-date",)
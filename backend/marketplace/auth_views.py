@@ -1,10 +1,11 @@
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from django.contrib.auth import authenticate
 from .models import User
 from .serializers import UserSerializer
+from .throttling import LoginThrottle, RegisterThrottle
 from rest_framework_simplejwt.tokens import RefreshToken
 
 def tokens_for_user(user):
@@ -13,6 +14,7 @@ def tokens_for_user(user):
 
 @api_view(["POST"])
 @permission_classes([AllowAny])
+@throttle_classes([RegisterThrottle])
 def register(request):
     full_name = request.data.get("full_name")
     phone = request.data.get("phone")
@@ -31,18 +33,13 @@ def register(request):
 
 @api_view(["POST"])
 @permission_classes([AllowAny])
+@throttle_classes([LoginThrottle])
 def login(request):
     phone = request.data.get("phone")
     password = request.data.get("password")
+    # authenticate() already checks the password (and hashes a dummy one for
+    # unknown phones), so a failed attempt costs exactly one PBKDF2 run.
     user = authenticate(request, phone=phone, password=password)
     if not user:
-        # manual fallback
-        try:
-            from .models import User
-            user_obj = User.objects.get(phone=phone)
-            if not user_obj.check_password(password):
-                raise Exception()
-            user = user_obj
-        except Exception:
-            return Response({"detail":"Invalid credentials"}, status=400)
+        return Response({"detail":"Invalid credentials"}, status=400)
     return Response({"user": UserSerializer(user).data, "tokens": tokens_for_user(user)})
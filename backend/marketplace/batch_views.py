@@ -0,0 +1,158 @@
+import asyncio
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections
+from django.urls import Resolver404, resolve
+from rest_framework import permissions, status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from .views import _forget_user_seller_ids, _user_seller_ids
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+ALLOWED_METHODS = SAFE_METHODS + ("POST", "PUT", "PATCH", "DELETE")
+# Copied from the outer request so sub-requests see the same client (throttling, host checks).
+FORWARDED_META = (
+    "REMOTE_ADDR",
+    "HTTP_X_FORWARDED_FOR",
+    "HTTP_X_FORWARDED_PROTO",
+    "HTTP_HOST",
+    "SERVER_NAME",
+    "SERVER_PORT",
+    "HTTP_USER_AGENT",
+    "HTTP_ACCEPT_LANGUAGE",
+)
+
+
+def _parse(items):
+    if not isinstance(items, list) or not items:
+        raise ValidationError("Send a non-empty list of requests.")
+    if len(items) > settings.BATCH_MAX_REQUESTS:
+        raise ValidationError(f"At most {settings.BATCH_MAX_REQUESTS} requests per batch.")
+    parsed = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not isinstance(item.get("path"), str):
+            raise ValidationError(f"Request {index} needs a path.")
+        method = str(item.get("method", "GET")).upper()
+        if method not in ALLOWED_METHODS:
+            raise ValidationError(f"Request {index}: method {method} is not allowed.")
+        url = urlsplit(item["path"])
+        if url.scheme or url.netloc or not url.path.startswith("/api/"):
+            raise ValidationError(f"Request {index}: path must be under /api/.")
+        if any(url.path.startswith(prefix) for prefix in settings.BATCH_EXCLUDE_PATHS):
+            raise ValidationError(f"Request {index}: {url.path} can't be batched.")
+        parsed.append(
+            {
+                "id": item.get("id", index),
+                "method": method,
+                "path": url.path,
+                "query": url.query,
+                "body": item.get("body"),
+            }
+        )
+    return parsed
+
+
+def _sub_request(request, item):
+    body = b"" if item["body"] is None else json.dumps(item["body"]).encode()
+    environ = {key: request.META[key] for key in FORWARDED_META if key in request.META}
+    environ.update(
+        {
+            "REQUEST_METHOD": item["method"],
+            "PATH_INFO": item["path"],
+            "QUERY_STRING": item["query"],
+            "CONTENT_TYPE": "application/json",
+            "CONTENT_LENGTH": str(len(body)),
+            "HTTP_ACCEPT": "application/json",
+            "wsgi.input": BytesIO(body),
+            "wsgi.url_scheme": request.scheme,
+        }
+    )
+    sub = WSGIRequest(environ)
+    # DRF authenticates these as the outer request's user without re-reading the token.
+    sub._force_auth_user = request.user
+    sub._force_auth_token = request.auth
+    return sub
+
+
+def _execute(request, item):
+    try:
+        match = resolve(item["path"])
+    except Resolver404:
+        return {"id": item["id"], "status": status.HTTP_404_NOT_FOUND, "body": {"detail": "Not found."}}
+    if asyncio.iscoroutinefunction(match.func):
+        return {
+            "id": item["id"],
+            "status": status.HTTP_400_BAD_REQUEST,
+            "body": {"detail": "Streaming endpoints can't be batched."},
+        }
+    try:
+        response = match.func(_sub_request(request, item), *match.args, **match.kwargs)
+    except Exception:
+        logger.exception("Batched %s %s failed", item["method"], item["path"])
+        return {
+            "id": item["id"],
+            "status": status.HTTP_500_INTERNAL_SERVER_ERROR,
+            "body": {"detail": "Server error."},
+        }
+    if hasattr(response, "data"):
+        body = response.data
+    elif response.streaming:
+        body = None
+    elif response.get("Content-Type", "").startswith("application/json"):
+        body = json.loads(response.content or b"null")
+    else:
+        body = response.content.decode(response.charset, errors="replace")
+    return {"id": item["id"], "status": response.status_code, "body": body}
+
+
+def _execute_in_thread(request, item):
+    try:
+        return _execute(request, item)
+    finally:
+        connections.close_all()
+
+
+@api_view(["POST"])
+@permission_classes([permissions.IsAuthenticated])
+def batch(request):
+    """
+    Run several API calls in one round trip. Body: a list (or {"requests": [...]})
+    of {"id", "method", "path", "body"}. The caller is authenticated once and
+    seller memberships are resolved once; consecutive GETs run concurrently,
+    writes run one at a time in order. Returns each sub-response's status and
+    body in request order.
+    """
+    items = request.data.get("requests") if isinstance(request.data, dict) else request.data
+    items = _parse(items)
+    _user_seller_ids(request.user)
+
+    results = []
+    with ThreadPoolExecutor(max_workers=settings.BATCH_MAX_WORKERS) as pool:
+        index = 0
+        while index < len(items):
+            if items[index]["method"] not in SAFE_METHODS:
+                results.append(_execute(request, items[index]))
+                # A write may have changed memberships (e.g. accepting an invitation).
+                _forget_user_seller_ids(request.user)
+                _user_seller_ids(request.user)
+                index += 1
+                continue
+            reads = []
+            while index < len(items) and items[index]["method"] in SAFE_METHODS:
+                reads.append(items[index])
+                index += 1
+            if len(reads) == 1:
+                results.append(_execute(request, reads[0]))
+            else:
+                results.extend(pool.map(lambda item: _execute_in_thread(request, item), reads))
+    return Response({"responses": results})
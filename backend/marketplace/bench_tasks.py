@@ -0,0 +1,24 @@
+"""
+Tasks for bench_celery_queues only. Production workers don't load them (they
+aren't in tasks.py, so autodiscovery skips them); start the workers under test
+with ``-I marketplace.bench_tasks``. The command passes queue and priority
+itself, so nothing here needs a CELERY_TASK_ROUTES entry.
+"""
+import time
+
+from celery import shared_task
+
+from core import celery_app  # noqa: F401  (see marketplace.tasks)
+
+
+@shared_task
+def bench_probe(sent_at):
+    """Latency probe, sent with initiate_payment's route."""
+    return time.time() - sent_at
+
+
+@shared_task
+def bench_bulk_job(ms):
+    """Stand-in for one slice of a bulk import."""
+    time.sleep(ms / 1000)
+    return ms
@@ -0,0 +1,42 @@
+import json
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from marketplace.services import archive
+
+
+def parse_month(value):
+    try:
+        return datetime.strptime(value, "%Y-%m").date()
+    except ValueError:
+        raise CommandError(f"Expected YYYY-MM, got {value!r}")
+
+
+class Command(BaseCommand):
+    help = "Archive closed months of payment payloads to cold storage, or read them back for audits"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--month", help="YYYY-MM; defaults to every closed, unarchived month")
+        parser.add_argument("--audit", action="store_true", help="Print archived rows for --month instead")
+        parser.add_argument("--tx-ref", help="With --audit, only rows with this tx_ref")
+        parser.add_argument("--order", help="With --audit, only rows for this order id")
+
+    def handle(self, *args, **options):
+        if options["audit"]:
+            if not options["month"]:
+                raise CommandError("--audit needs --month")
+            rows = archive.archived_payments(
+                parse_month(options["month"]),
+                tx_ref=options["tx_ref"],
+                order_id=options["order"],
+            )
+            for row in rows:
+                self.stdout.write(json.dumps(row))
+            return
+
+        months = [parse_month(options["month"])] if options["month"] else archive.closed_months()
+        for month in months:
+            record = archive.archive_month(month)
+            self.stdout.write(f"{month:%Y-%m}: {record.row_count} rows -> {record.storage_key}")
+        self.stdout.write(self.style.SUCCESS(f"{len(months)} month(s) archived"))
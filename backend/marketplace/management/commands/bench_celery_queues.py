@@ -0,0 +1,68 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import celery_metrics
+from marketplace.bench_tasks import bench_bulk_job, bench_probe
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Flood the bulk queue with slow jobs while timing latency probes routed like "
+        "webhook/payment work. Needs workers that load the bench tasks, e.g. "
+        "'celery -A core worker -Q critical -I marketplace.bench_tasks' and the same with -Q bulk."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--bulk-jobs", type=int, default=500, help="Simulated import slices to enqueue")
+        parser.add_argument("--bulk-ms", type=int, default=200, help="Duration of each import slice")
+        parser.add_argument("--probes", type=int, default=50)
+        parser.add_argument("--interval", type=float, default=0.1, help="Seconds between probes")
+        parser.add_argument("--timeout", type=float, default=120, help="Seconds to wait for each probe")
+        parser.add_argument(
+            "--single-queue",
+            action="store_true",
+            help="Send probes and bulk jobs to the same queue (the old FIFO setup) for comparison",
+        )
+
+    def handle(self, *args, **options):
+        if options["single_queue"]:
+            # Pin the priority too, or the probes would still jump the queue.
+            bulk = probe = {"queue": "default", "priority": settings.CELERY_TASK_DEFAULT_PRIORITY}
+        else:
+            bulk = {"queue": "bulk"}
+            probe = settings.CELERY_TASK_ROUTES["marketplace.tasks.initiate_payment"]
+        for _ in range(options["bulk_jobs"]):
+            bench_bulk_job.apply_async((options["bulk_ms"],), **bulk)
+        self.stdout.write(f"Queued {options['bulk_jobs']} x {options['bulk_ms']} ms bulk jobs")
+
+        results = []
+        for _ in range(options["probes"]):
+            results.append(bench_probe.apply_async((time.time(),), **probe))
+            time.sleep(options["interval"])
+        try:
+            latencies = [r.get(timeout=options["timeout"]) * 1000 for r in results]
+        except Exception as exc:
+            raise CommandError(
+                f"Probes didn't finish within {options['timeout']}s ({exc.__class__.__name__}); "
+                "is a worker started with -I marketplace.bench_tasks consuming their queue?"
+            )
+
+        depths = celery_metrics.queue_depths()
+        self.stdout.write(
+            f"Probe queue-to-start latency over {len(latencies)} probes: "
+            f"p50 {statistics.median(latencies):.1f} ms, p95 {_percentile(latencies, 0.95):.1f} ms, "
+            f"max {max(latencies):.1f} ms"
+        )
+        for name, queue in depths["queues"].items():
+            self.stdout.write(f"  {name:<8} still waiting: {queue['depth']}")
+        self.stdout.write(
+            "Bulk jobs keep draining in the background; see /api/ops/celery/ for per-task histograms."
+        )
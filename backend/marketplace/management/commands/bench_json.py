@@ -0,0 +1,113 @@
+import json
+import random
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from marketplace.renderers import ORJSONRenderer, orjson
+
+
+def catalogue_page(size, rng):
+    """Shaped like a ProductSerializer page: DecimalField values are strings."""
+    now = timezone.now()
+    return {
+        "count": size * 20,
+        "next": "https://api.example.com/api/products/?page=2",
+        "previous": None,
+        "results": [
+            {
+                "id": uuid.UUID(int=rng.getrandbits(128)),
+                "seller": uuid.UUID(int=rng.getrandbits(128)),
+                "name": f"Cement 42.5N bag {i}",
+                "category": rng.choice(["cement", "steel", "timber", "roofing"]),
+                "brand": rng.choice(["Twiga", "Simba", "Dangote", ""]),
+                "unit": "bag",
+                "price": f"{rng.randint(1000, 900000)}.{rng.randint(0, 99):02d}",
+                "stock": rng.randint(0, 5000),
+                "weight_kg": "50.000",
+                "created_at": now - timedelta(minutes=i),
+            }
+            for i in range(size)
+        ],
+    }
+
+
+def order_list(size, rng):
+    """Orders with nested items and raw Decimals, as in hand-built payloads."""
+    now = timezone.now()
+    orders = []
+    for i in range(size):
+        items = [
+            {
+                "product": uuid.UUID(int=rng.getrandbits(128)),
+                "quantity": rng.randint(1, 40),
+                "unit_price": Decimal(rng.randint(1000, 90000)) / 100,
+            }
+            for _ in range(rng.randint(1, 6))
+        ]
+        orders.append(
+            {
+                "id": uuid.UUID(int=rng.getrandbits(128)),
+                "status": "pending",
+                "total": sum(item["unit_price"] * item["quantity"] for item in items),
+                "delivery_address": {"street": "Mikocheni B", "lat": -6.7631, "lng": 39.2453},
+                "items": items,
+                "created_at": now - timedelta(hours=i),
+            }
+        )
+    return orders
+
+
+class Command(BaseCommand):
+    help = "Compare DRF's JSONRenderer with the orjson renderer: byte parity and throughput"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size", type=int, default=50, help="Rows per payload")
+        parser.add_argument("--iterations", type=int, default=500)
+        parser.add_argument("--json", action="store_true", help="Machine-readable output")
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            raise CommandError("orjson is not installed; ORJSONRenderer falls back to DRF's renderer")
+        rng = random.Random(0)
+        payloads = {
+            "catalogue_page": catalogue_page(options["size"], rng),
+            "order_list": order_list(options["size"], rng),
+        }
+        renderers = {"drf": JSONRenderer(), "orjson": ORJSONRenderer()}
+        iterations = max(1, options["iterations"])
+
+        report = {}
+        for name, data in payloads.items():
+            expected = renderers["drf"].render(data)
+            if renderers["orjson"].render(data) != expected:
+                raise CommandError(f"{name}: orjson output differs from DRF's")
+            row = {"bytes": len(expected)}
+            for label, renderer in renderers.items():
+                start = time.perf_counter()
+                for _ in range(iterations):
+                    renderer.render(data)
+                elapsed = time.perf_counter() - start
+                row[label] = {
+                    "ops_per_s": round(iterations / elapsed, 1),
+                    "mb_per_s": round(len(expected) * iterations / elapsed / 1e6, 1),
+                }
+            row["speedup"] = round(row["orjson"]["ops_per_s"] / row["drf"]["ops_per_s"], 2)
+            report[name] = row
+
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        for name, row in report.items():
+            self.stdout.write(f"{name} ({row['bytes']} bytes, output identical)")
+            for label in renderers:
+                stats = row[label]
+                self.stdout.write(
+                    f"  {label:<8}{stats['ops_per_s']:>12.1f} ops/s{stats['mb_per_s']:>10.1f} MB/s"
+                )
+            self.stdout.write(f"  speedup {row['speedup']}x")
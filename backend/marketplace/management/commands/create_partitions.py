@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from marketplace.services.partitions import ensure_partitions
+
+
+class Command(BaseCommand):
+    help = "Create upcoming monthly partitions for partitioned marketplace tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--months", type=int, default=None, help="How many months ahead to cover")
+
+    def handle(self, *args, **options):
+        created = ensure_partitions(months_ahead=options["months"])
+        for name in created:
+            self.stdout.write(f"created {name}")
+        self.stdout.write(self.style.SUCCESS(f"{len(created)} partition(s) created"))
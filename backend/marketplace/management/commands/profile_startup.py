@@ -0,0 +1,156 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter so nothing is already imported. Times each
+# startup phase, and every app's import / models import / ready() inside
+# django.setup(), then prints one JSON document on stdout.
+PROBE = r"""
+import json, sys, time
+t0 = time.perf_counter()
+marks = {}
+import django
+from django.apps import config as app_config
+from django.conf import settings
+marks["import_django"] = time.perf_counter() - t0
+
+apps = {}
+create, import_models = app_config.AppConfig.create, app_config.AppConfig.import_models
+
+def timed_create(entry):
+    start = time.perf_counter()
+    app = create(entry)
+    apps.setdefault(app.name, {})["import"] = time.perf_counter() - start
+    ready = app.ready
+    def timed_ready():
+        start = time.perf_counter()
+        ready()
+        apps[app.name]["ready"] = time.perf_counter() - start
+    app.ready = timed_ready
+    return app
+
+def timed_import_models(self):
+    start = time.perf_counter()
+    import_models(self)
+    apps.setdefault(self.name, {})["models"] = time.perf_counter() - start
+
+app_config.AppConfig.create = staticmethod(timed_create)
+app_config.AppConfig.import_models = timed_import_models
+
+start = time.perf_counter()
+settings.INSTALLED_APPS
+marks["settings"] = time.perf_counter() - start
+start = time.perf_counter()
+django.setup()
+marks["django_setup"] = time.perf_counter() - start
+if "--urls" in sys.argv:
+    from django.urls import get_resolver
+    start = time.perf_counter()
+    get_resolver().url_patterns
+    marks["urlconf"] = time.perf_counter() - start
+if "--app" in sys.argv:
+    start = time.perf_counter()
+    __import__(settings.WSGI_APPLICATION.rsplit(".", 1)[0])
+    marks["wsgi_app"] = time.perf_counter() - start
+marks["total"] = time.perf_counter() - t0
+print(json.dumps({"phases": marks, "apps": apps}))
+"""
+
+
+def parse_importtime(stderr):
+    """Sum ``-X importtime`` self time (µs) per module."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def by_package(modules):
+    totals = defaultdict(int)
+    for name, (self_us, _) in modules.items():
+        totals[name.split(".")[0]] += self_us
+    return totals
+
+
+class Command(BaseCommand):
+    help = "Measure cold-start time: import cost per package and django.setup() cost per app"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=3, help="Runs to take the median of")
+        parser.add_argument("--top", type=int, default=15, help="Packages to list")
+        parser.add_argument("--json", action="store_true", help="Machine-readable output for CI")
+        parser.add_argument("--no-urls", action="store_true", help="Skip importing the URLconf")
+        parser.add_argument("--max-total-ms", type=float, help="Fail if median total exceeds this")
+
+    def run_probe(self, with_urls):
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "core.settings")}
+        args = [sys.executable, "-X", "importtime", "-c", PROBE, "--app"]
+        if with_urls:
+            args.append("--urls")
+        result = subprocess.run(
+            args, cwd=settings.BASE_DIR, env=env, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            raise CommandError(result.stderr.splitlines()[-1] if result.stderr else "probe failed")
+        report = json.loads(result.stdout.strip().splitlines()[-1])
+        report["packages"] = by_package(parse_importtime(result.stderr))
+        return report
+
+    def handle(self, *args, **options):
+        runs = [self.run_probe(not options["no_urls"]) for _ in range(max(1, options["repeat"]))]
+
+        def median(values):
+            return statistics.median(values) * 1000
+
+        phases = {
+            phase: round(median([r["phases"][phase] for r in runs]), 1)
+            for phase in runs[0]["phases"]
+        }
+        apps = {}
+        for name in runs[0]["apps"]:
+            apps[name] = {
+                step: round(median([r["apps"].get(name, {}).get(step, 0) for r in runs]), 1)
+                for step in ("import", "models", "ready")
+            }
+        packages = defaultdict(list)
+        for run in runs:
+            for package, self_us in run["packages"].items():
+                packages[package].append(self_us / 1e6)
+        packages = sorted(
+            ((name, round(median(values), 1)) for name, values in packages.items()),
+            key=lambda item: -item[1],
+        )[: options["top"]]
+
+        report = {
+            "runs": len(runs),
+            "phases_ms": phases,
+            "apps_ms": apps,
+            "packages_ms": dict(packages),
+        }
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self.stdout.write("Phases (median ms)")
+            for phase, ms in phases.items():
+                self.stdout.write(f"  {phase:<16}{ms:>10.1f}")
+            self.stdout.write("django.setup() per app (ms: import / models / ready)")
+            for name, steps in sorted(apps.items(), key=lambda kv: -sum(kv[1].values())):
+                self.stdout.write(
+                    f"  {name:<36}{steps['import']:>8.1f}{steps['models']:>8.1f}{steps['ready']:>8.1f}"
+                )
+            self.stdout.write(f"Top {len(packages)} packages by import self time (ms)")
+            for name, ms in packages:
+                self.stdout.write(f"  {name:<36}{ms:>10.1f}")
+
+        limit = options["max_total_ms"]
+        if limit is not None and phases["total"] > limit:
+            raise CommandError(f"Startup took {phases['total']:.1f}ms, over the {limit:.1f}ms budget")
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from marketplace.services import snapshots
+
+
+class Command(BaseCommand):
+    help = "Publish catalogue snapshot JSON (categories, storefronts, products) to the snapshots storage"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all", action="store_true", help="Rebuild every shard instead of only the changed ones"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            result = snapshots.publish() if options["all"] else snapshots.publish_dirty()
+        except snapshots.PublishBusy:
+            raise CommandError("Another publish is running; try again shortly.")
+        if result is None:
+            self.stdout.write("Nothing to publish")
+            return
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Published manifest v{result['version']} ({result['written']} files written"
+                f"{', full rebuild' if result['full'] else ''})"
+            )
+        )
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from marketplace.services import recommendations
+
+
+class Command(BaseCommand):
+    help = "Rebuild the frequently-bought-together table from all confirmed orders"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, help="Orders read per query")
+
+    def handle(self, *args, **options):
+        scanned, products = recommendations.rebuild(chunk_size=options["chunk_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Scanned {scanned} orders; {products} products have recommendations")
+        )
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-19 09:12
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0002_sellerinvitation_selleruser'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='weight_kg',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.CreateModel(
+            name='ShippingZone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('area', django.contrib.gis.db.models.fields.MultiPolygonField(srid=4326)),
+                ('base_fee', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('per_km_fee', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('per_kg_fee', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,101 @@
+from django.db import migrations, models
+
+
+# Converts marketplace_payment into a table range-partitioned by month on
+# created_at. Postgres requires the partition key in the primary key, so the
+# database PK becomes (id, created_at); Django keeps treating ``id`` as the pk.
+# Monthly partitions are created from the oldest payment up to three months
+# ahead; `manage.py create_partitions` keeps extending them.
+PARTITION_PAYMENTS = """
+ALTER TABLE marketplace_payment RENAME TO marketplace_payment_legacy;
+ALTER TABLE marketplace_payment_legacy RENAME CONSTRAINT marketplace_payment_pkey TO marketplace_payment_legacy_pkey;
+
+CREATE TABLE marketplace_payment (
+    LIKE marketplace_payment_legacy INCLUDING DEFAULTS
+) PARTITION BY RANGE (created_at);
+ALTER TABLE marketplace_payment ADD CONSTRAINT marketplace_payment_pkey PRIMARY KEY (id, created_at);
+ALTER TABLE marketplace_payment ADD CONSTRAINT payment_order_id_fk
+    FOREIGN KEY (order_id) REFERENCES marketplace_order (id) DEFERRABLE INITIALLY DEFERRED;
+CREATE INDEX payment_order_id_idx ON marketplace_payment (order_id);
+CREATE INDEX payment_tx_ref_idx ON marketplace_payment (tx_ref);
+CREATE INDEX payment_created_at_idx ON marketplace_payment (created_at);
+CREATE TABLE marketplace_payment_default PARTITION OF marketplace_payment DEFAULT;
+
+DO $$
+DECLARE
+    cur date := date_trunc(
+        'month', COALESCE((SELECT min(created_at) FROM marketplace_payment_legacy), now()) AT TIME ZONE 'UTC'
+    )::date;
+    stop date := (date_trunc('month', now() AT TIME ZONE 'UTC') + interval '3 months')::date;
+BEGIN
+    WHILE cur <= stop LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF marketplace_payment FOR VALUES FROM (%L) TO (%L)',
+            'marketplace_payment_p' || to_char(cur, 'YYYY_MM'),
+            cur::timestamp AT TIME ZONE 'UTC',
+            (cur + interval '1 month')::timestamp AT TIME ZONE 'UTC'
+        );
+        cur := (cur + interval '1 month')::date;
+    END LOOP;
+END $$;
+
+INSERT INTO marketplace_payment SELECT * FROM marketplace_payment_legacy;
+DROP TABLE marketplace_payment_legacy;
+"""
+
+UNPARTITION_PAYMENTS = """
+CREATE TABLE marketplace_payment_plain (LIKE marketplace_payment INCLUDING DEFAULTS);
+INSERT INTO marketplace_payment_plain SELECT * FROM marketplace_payment;
+DROP TABLE marketplace_payment;
+ALTER TABLE marketplace_payment_plain RENAME TO marketplace_payment;
+ALTER TABLE marketplace_payment ADD CONSTRAINT marketplace_payment_pkey PRIMARY KEY (id);
+ALTER TABLE marketplace_payment ADD CONSTRAINT payment_order_id_fk
+    FOREIGN KEY (order_id) REFERENCES marketplace_order (id) DEFERRABLE INITIALLY DEFERRED;
+CREATE INDEX payment_order_id_idx ON marketplace_payment (order_id);
+CREATE INDEX payment_tx_ref_idx ON marketplace_payment (tx_ref);
+CREATE INDEX payment_created_at_idx ON marketplace_payment (created_at);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0004_outboxevent'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['buyer', '-created_at'], name='order_buyer_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['seller', '-created_at'], name='order_seller_recent_idx'),
+        ),
+        migrations.CreateModel(
+            name='PaymentArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(unique=True)),
+                ('storage_key', models.CharField(max_length=255)),
+                ('row_count', models.PositiveIntegerField()),
+                ('size_bytes', models.PositiveBigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(PARTITION_PAYMENTS, UNPARTITION_PAYMENTS),
+            ],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='payment',
+                    index=models.Index(fields=['tx_ref'], name='payment_tx_ref_idx'),
+                ),
+                migrations.AddIndex(
+                    model_name='payment',
+                    index=models.Index(fields=['created_at'], name='payment_created_at_idx'),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0005_partition_payments'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', '-created_at'], name='order_status_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['status', '-created_at'], name='payment_status_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sellerinvitation',
+            index=models.Index(fields=['seller', 'status'], name='invitation_seller_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sellerinvitation',
+            index=models.Index(fields=['status', '-created_at'], name='invitation_status_recent_idx'),
+        ),
+    ]
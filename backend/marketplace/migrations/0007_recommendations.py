@@ -0,0 +1,53 @@
+# Generated by Django 5.2.7 on 2026-10-19 14:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0006_admin_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='confirmed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        # Existing confirmed orders have no better timestamp than their last update.
+        migrations.RunSQL(
+            sql="""
+                UPDATE marketplace_order SET confirmed_at = updated_at
+                WHERE status IN ('confirmed', 'dispatched', 'delivered')
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['confirmed_at'], name='order_confirmed_at_idx'),
+        ),
+        migrations.CreateModel(
+            name='JobCursor',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('position', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProductAffinity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='affinities', to='marketplace.product')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='marketplace.product')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('product', 'related'), name='affinity_pair_uniq')],
+                'indexes': [models.Index(fields=['product', '-score'], name='affinity_top_idx')],
+            },
+        ),
+    ]
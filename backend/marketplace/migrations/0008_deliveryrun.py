@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-19 15:30
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0007_recommendations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeliveryRun',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('status', models.CharField(choices=[('planned', 'Planned'), ('dispatched', 'Dispatched')], default='planned', max_length=20)),
+                ('stop_count', models.PositiveIntegerField(default=0)),
+                ('distance_km', models.DecimalField(decimal_places=2, default=0, max_digits=8)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('dispatched_at', models.DateTimeField(blank=True, null=True)),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='delivery_runs', to='marketplace.seller')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['seller', 'date'], name='deliveryrun_seller_date_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='delivery_run',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stops', to='marketplace.deliveryrun'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='run_sequence',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:40
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently, TrigramExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run in a transaction; building the GIN
+    # indexes this way keeps the products table writable meanwhile.
+    atomic = False
+
+    dependencies = [
+        ('marketplace', '0008_deliveryrun'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='product',
+            name='popularity',
+            field=models.FloatField(default=0),
+        ),
+        AddIndexConcurrently(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='product_name_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        AddIndexConcurrently(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['brand'], name='product_brand_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        AddIndexConcurrently(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['category'], name='product_category_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-20 09:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0009_product_trigram_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxevent',
+            name='failed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RemoveIndex(
+            model_name='outboxevent',
+            name='outbox_pending_idx',
+        ),
+        migrations.AddIndex(
+            model_name='outboxevent',
+            index=models.Index(condition=models.Q(('failed_at__isnull', True), ('sent_at__isnull', True)), fields=['available_at'], name='outbox_pending_idx'),
+        ),
+    ]
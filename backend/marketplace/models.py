@@ -1,6 +1,8 @@
 import uuid
 from django.conf import settings
+from django.utils import timezone
 from django.contrib.gis.db import models
+from django.contrib.postgres.indexes import GinIndex
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
 
 class UserManager(BaseUserManager):
@@ -110,6 +112,12 @@ class SellerInvitation(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     accepted_at = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["seller", "status"], name="invitation_seller_status_idx"),
+            models.Index(fields=["status", "-created_at"], name="invitation_status_recent_idx"),
+        ]
+
     def __str__(self):
         return f"Invite {self.email} to {self.seller.business_name} ({self.status})"
 
@@ -123,10 +131,51 @@ class Product(models.Model):
     unit = models.CharField(max_length=30)
     price = models.DecimalField(max_digits=12, decimal_places=2)
     stock = models.PositiveIntegerField(default=0)
+    weight_kg = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     images = models.JSONField(default=list)
+    # Decayed count of confirmed orders, maintained by recommendation mining.
+    popularity = models.FloatField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            GinIndex(fields=["name"], opclasses=["gin_trgm_ops"], name="product_name_trgm_idx"),
+            GinIndex(fields=["brand"], opclasses=["gin_trgm_ops"], name="product_brand_trgm_idx"),
+            GinIndex(fields=["category"], opclasses=["gin_trgm_ops"], name="product_category_trgm_idx"),
+        ]
+
+class ShippingZone(models.Model):
+    name = models.CharField(max_length=100)
+    area = models.MultiPolygonField(srid=4326)
+    base_fee = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    per_km_fee = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    per_kg_fee = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+class DeliveryRun(models.Model):
+    """One vehicle trip from a seller's pickup point through an ordered list of drops."""
+    STATUS_PLANNED = "planned"
+    STATUS_DISPATCHED = "dispatched"
+    STATUS = [(STATUS_PLANNED, "Planned"), (STATUS_DISPATCHED, "Dispatched")]
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    seller = models.ForeignKey(Seller, on_delete=models.CASCADE, related_name="delivery_runs")
+    date = models.DateField()
+    status = models.CharField(max_length=20, choices=STATUS, default=STATUS_PLANNED)
+    stop_count = models.PositiveIntegerField(default=0)
+    distance_km = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    dispatched_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["seller", "date"], name="deliveryrun_seller_date_idx"),
+        ]
+
 class Order(models.Model):
     STATUS = [('pending','Pending'),('confirmed','Confirmed'),('dispatched','Dispatched'),('delivered','Delivered'),('cancelled','Cancelled')]
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -141,6 +190,19 @@ class Order(models.Model):
     delivery_address = models.JSONField(default=dict)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now_add=True)
+    confirmed_at = models.DateTimeField(null=True, blank=True)
+    delivery_run = models.ForeignKey(
+        DeliveryRun, on_delete=models.SET_NULL, null=True, blank=True, related_name="stops"
+    )
+    run_sequence = models.PositiveIntegerField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["confirmed_at"], name="order_confirmed_at_idx"),
+            models.Index(fields=["buyer", "-created_at"], name="order_buyer_recent_idx"),
+            models.Index(fields=["seller", "-created_at"], name="order_seller_recent_idx"),
+            models.Index(fields=["status", "-created_at"], name="order_status_recent_idx"),
+        ]
 
 class OrderItem(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -150,6 +212,34 @@ class OrderItem(models.Model):
     unit_price = models.DecimalField(max_digits=12, decimal_places=2)
     line_total = models.DecimalField(max_digits=12, decimal_places=2)
 
+class ProductAffinity(models.Model):
+    """
+    Top-K "frequently bought together" products per product, mined from
+    confirmed orders. Scores are decayed against a fixed epoch, so only their
+    order within one product is meaningful.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="affinities")
+    related = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="+")
+    score = models.FloatField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["product", "related"], name="affinity_pair_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["product", "-score"], name="affinity_top_idx"),
+        ]
+
+class JobCursor(models.Model):
+    """High-water mark for incremental batch jobs."""
+    name = models.CharField(max_length=100, primary_key=True)
+    position = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.position}"
+
 class Payment(models.Model):
     STATUS = [('pending','Pending'),('success','Success'),('failed','Failed')]
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -162,6 +252,26 @@ class Payment(models.Model):
     payload = models.JSONField(default=dict)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        # The table is range-partitioned by month on created_at (migration 0005);
+        # the database primary key is (id, created_at).
+        indexes = [
+            models.Index(fields=["tx_ref"], name="payment_tx_ref_idx"),
+            models.Index(fields=["created_at"], name="payment_created_at_idx"),
+            models.Index(fields=["status", "-created_at"], name="payment_status_recent_idx"),
+        ]
+
+class PaymentArchive(models.Model):
+    """A closed month of Payment payloads moved to compressed cold storage."""
+    month = models.DateField(unique=True)
+    storage_key = models.CharField(max_length=255)
+    row_count = models.PositiveIntegerField()
+    size_bytes = models.PositiveBigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Payments {self.month:%Y-%m} ({self.row_count} rows)"
+
 class Invoice(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     order = models.ForeignKey(Order, on_delete=models.CASCADE)
@@ -170,3 +280,30 @@ class Invoice(models.Model):
     tra_token = models.TextField(blank=True, null=True)
     pdf_url = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+
+class OutboxEvent(models.Model):
+    CHANNEL_SMS = "sms"
+    CHANNEL_EMAIL = "email"
+    CHANNEL_CHOICES = [(CHANNEL_SMS, "SMS"), (CHANNEL_EMAIL, "Email")]
+
+    kind = models.CharField(max_length=50)
+    channel = models.CharField(max_length=10, choices=CHANNEL_CHOICES)
+    recipient = models.CharField(max_length=254)
+    payload = models.JSONField(default=dict)
+    dedupe_key = models.CharField(max_length=200, unique=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default="")
+    available_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    # Set when an event gives up after OUTBOX_MAX_ATTEMPTS; it is never retried.
+    failed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["available_at"],
+                condition=models.Q(sent_at__isnull=True, failed_at__isnull=True),
+                name="outbox_pending_idx",
+            ),
+        ]
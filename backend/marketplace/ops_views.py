@@ -0,0 +1,70 @@
+import re
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+
+from core import db_metrics, profiling
+from .permissions import IsOpsAdmin
+
+
+@api_view(["GET"])
+@permission_classes([IsOpsAdmin])
+def db_pool_stats(request):
+    """
+    Per-worker connection stats: pool size/availability, checkouts
+    (requests_num), cumulative wait (requests_wait_ms) and connections created.
+    """
+    return Response({"current": db_metrics.snapshot(), "workers": db_metrics.all_workers()})
+
+
+@api_view(["GET"])
+@permission_classes([IsOpsAdmin])
+def celery_stats(request):
+    """
+    Broker queue depth per queue and priority step, queue wait per queue, and
+    per-task runtime histograms (ms, cumulative), retries and failures.
+    """
+    from core import celery_metrics  # imports Celery; keep it off the startup path
+
+    return Response(celery_metrics.snapshot())
+
+
+PROFILE_KEY = re.compile(r"^\d{4}/\d{2}/\d{2}/[0-9a-f]{32}$")
+
+
+@api_view(["GET"])
+@permission_classes([IsOpsAdmin])
+def profiles(request):
+    """Most recent request profiles, newest first (?limit=, default 100)."""
+    try:
+        limit = min(int(request.query_params.get("limit", 100)), 500)
+    except ValueError:
+        limit = 100
+    return Response({"results": profiling.recent_profiles(limit)})
+
+
+@api_view(["GET"])
+@permission_classes([IsOpsAdmin])
+def profile_detail(request, key):
+    """A stored profile as JSON, or ?format=folded for flamegraph.pl / speedscope input."""
+    if not PROFILE_KEY.match(key):
+        raise Http404
+    folded = request.query_params.get("format") == "folded"
+    try:
+        data = profiling.open_profile(key, folded=folded)
+    except FileNotFoundError:
+        raise Http404
+    if folded:
+        return HttpResponse(data, content_type="text/plain; charset=utf-8")
+    return Response(data)
+
+
+@api_view(["POST"])
+@permission_classes([IsOpsAdmin])
+def profile_token(request):
+    """Signed value for the X-Profile header; any request carrying it is profiled."""
+    return Response(
+        {"header": "X-Profile", "token": profiling.issue_token(), "max_age": settings.PROFILER_TOKEN_MAX_AGE}
+    )
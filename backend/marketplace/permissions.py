@@ -9,3 +9,9 @@ class IsSellerOrReadOnly(BasePermission):
 class IsBuyerOnly(BasePermission):
     def has_permission(self, request, view):
         return request.user.is_authenticated and request.user.role == "buyer"
+
+class IsOpsAdmin(BasePermission):
+    def has_permission(self, request, view):
+        return request.user.is_authenticated and (
+            request.user.is_staff or request.user.role == "ops_admin"
+        )
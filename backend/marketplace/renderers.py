@@ -0,0 +1,75 @@
+import codecs
+
+from django.conf import settings
+from django.contrib.gis.geos import GEOSGeometry
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+# Datetimes and dataclasses are passed through to DRF's encoder so their
+# output (e.g. "Z" for UTC, millisecond-free times) stays byte-for-byte the same.
+ORJSON_OPTIONS = (
+    orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS
+    if orjson
+    else 0
+)
+LINE_SEPARATORS = ((b"\xe2\x80\xa8", b"\\u2028"), (b"\xe2\x80\xa9", b"\\u2029"))
+
+_drf_default = JSONEncoder().default
+
+
+def _default(obj):
+    if isinstance(obj, GEOSGeometry):
+        # Same EWKT string ModelSerializer emits for geometry fields.
+        return str(obj)
+    return _drf_default(obj)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    Drop-in JSONRenderer on orjson. Decimal, UUID, datetime and GEOS values
+    encode exactly as with DRF's encoder; indented, ASCII-only or non-compact
+    output, a missing orjson, or anything orjson rejects use the stock renderer.
+
+    Floats are equal in value but not always in bytes: orjson writes exponents
+    without a sign or padding (1e16, 1.5e-7 where json writes 1e+16, 1.5e-07),
+    and NaN/Infinity render as null where DRF's strict renderer raises. Money
+    fields are Decimals rendered as strings and are unaffected.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if (
+            orjson is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=_default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        if b"\xe2\x80" in ret:
+            for raw, escaped in LINE_SEPARATORS:
+                ret = ret.replace(raw, escaped)
+        return ret
+
+
+class ORJSONParser(JSONParser):
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if orjson is None or codecs.lookup(encoding).name != "utf-8":
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError("JSON parse error - %s" % str(exc))
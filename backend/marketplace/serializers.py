@@ -5,6 +5,7 @@ from .models import (
     Product,
     Order,
     OrderItem,
+    DeliveryRun,
     Payment,
     SellerUser,
     SellerInvitation,
@@ -49,7 +50,7 @@ class ProductSerializer(serializers.ModelSerializer):
     class Meta:
         model = Product
         fields = "__all__"
-        read_only_fields = ("id","seller","created_at","updated_at")
+        read_only_fields = ("id","seller","popularity","created_at","updated_at")
 
 class OrderItemSerializer(serializers.ModelSerializer):
     class Meta:
@@ -61,12 +62,27 @@ class OrderSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order
         fields = "__all__"
-        read_only_fields = ("id","buyer","subtotal","tax","shipping_fee","total","created_at","updated_at")
+        read_only_fields = ("id","buyer","subtotal","tax","shipping_fee","total","created_at","updated_at","confirmed_at")
+
+class DeliveryStopSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Order
+        fields = ("id","run_sequence","buyer","status","total","delivery_address")
+        read_only_fields = fields
+
+class DeliveryRunSerializer(serializers.ModelSerializer):
+    stops = DeliveryStopSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = DeliveryRun
+        fields = ("id","seller","date","status","stop_count","distance_km","created_at","dispatched_at","stops")
+        read_only_fields = fields
 
 class PaymentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Payment
         fields = "__all__"
+        read_only_fields = ("amount","tx_ref","status","payload","created_at")
 
 
 class SellerInvitationSerializer(serializers.ModelSerializer):
@@ -0,0 +1,73 @@
+import gzip
+import json
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import storages
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from marketplace.models import Payment, PaymentArchive
+from .partitions import add_months, existing_partitions, month_bounds, month_start
+
+ARCHIVE_FIELDS = ("id", "order_id", "method", "provider", "tx_ref", "amount", "status", "payload", "created_at")
+
+
+def archive_storage():
+    return storages["archive"]
+
+
+def closed_months(today=None):
+    """Partitioned months older than PAYMENT_ARCHIVE_AFTER_MONTHS that aren't archived yet."""
+    cutoff = add_months(month_start(today or timezone.now()), -settings.PAYMENT_ARCHIVE_AFTER_MONTHS)
+    done = set(PaymentArchive.objects.values_list("month", flat=True))
+    return [m for m in existing_partitions("marketplace_payment") if m < cutoff and m not in done]
+
+
+def archive_month(month):
+    """
+    Stream one month of payments (all columns, including the full webhook
+    payload) into a gzipped JSON-lines object, then blank the hot payloads.
+    Rows stay in Postgres so order/payment history is intact; audits read the
+    payload back with ``archived_payments``.
+    """
+    month = month_start(month)
+    start, end = month_bounds(month)
+    rows = Payment.objects.filter(created_at__gte=start, created_at__lt=end)
+    count = 0
+    with tempfile.TemporaryFile() as tmp:
+        with gzip.GzipFile(fileobj=tmp, mode="wb") as gz:
+            for row in rows.values(*ARCHIVE_FIELDS).order_by().iterator(chunk_size=2000):
+                gz.write(json.dumps(row, cls=DjangoJSONEncoder).encode() + b"\n")
+                count += 1
+        size = tmp.tell()
+        tmp.seek(0)
+        key = archive_storage().save(f"payments/{month:%Y/%m}/payments-{month:%Y-%m}.jsonl.gz", File(tmp))
+
+    with transaction.atomic():
+        rows.exclude(payload={}).update(payload={})
+        return PaymentArchive.objects.create(month=month, storage_key=key, row_count=count, size_bytes=size)
+
+
+def archived_payments(month, tx_ref=None, order_id=None):
+    """Yield archived payment rows for ``month``, optionally filtered."""
+    archive = PaymentArchive.objects.get(month=month_start(month))
+    with archive_storage().open(archive.storage_key, "rb") as fh:
+        with gzip.GzipFile(fileobj=fh, mode="rb") as gz:
+            for line in gz:
+                row = json.loads(line)
+                if tx_ref and row["tx_ref"] != tx_ref:
+                    continue
+                if order_id and row["order_id"] != str(order_id):
+                    continue
+                yield row
+
+
+def archived_payload(payment):
+    """Full webhook payload for a payment whose hot copy has been archived."""
+    for row in archived_payments(payment.created_at, tx_ref=payment.tx_ref):
+        if row["id"] == str(payment.pk):
+            return row["payload"]
+    return None
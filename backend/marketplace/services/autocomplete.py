@@ -0,0 +1,130 @@
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import Greatest, Ln
+from django.utils import timezone
+
+from marketplace.models import Product
+from .catalogue import cached_facets, catalogue_version
+
+MIN_LENGTH = 2
+MAX_LENGTH = 50
+
+# Categories are few, so they are matched against the cached facet list
+# rather than by a DISTINCT over every matching product row.
+CATEGORY_SQL = """
+    SELECT category FROM unnest(%s::text[]) AS category
+    WHERE %s <%% category
+    ORDER BY word_similarity(%s, category) DESC, category
+    LIMIT %s
+"""
+
+
+class LocalLRU:
+    """Small thread-safe LRU kept in each worker, in front of the shared cache."""
+
+    def __init__(self, size):
+        self.size = size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.size:
+                self._data.popitem(last=False)
+
+
+_local = LocalLRU(settings.AUTOCOMPLETE_LOCAL_CACHE_SIZE)
+
+
+def normalize(q):
+    return " ".join((q or "").lower().split())[:MAX_LENGTH]
+
+
+def _popularity_scale():
+    from .recommendations import order_weight
+
+    # Popularity is stored against the mining epoch; divide by today's weight
+    # to get a decayed order count comparable across products.
+    return order_weight(timezone.now())
+
+
+def _category_names():
+    facets = cached_facets(Product.objects.all(), {})
+    return [entry["value"] for entry in facets["categories"]]
+
+
+def search(q, limit):
+    """
+    Products whose name or brand contains a word similar to ``q`` (pg_trgm
+    word similarity, so "cemnt" finds "Cement 42.5N"), ranked by similarity
+    plus a popularity boost, and the closest category names.
+    """
+    products = (
+        Product.objects.filter(Q(name__trigram_word_similar=q) | Q(brand__trigram_word_similar=q))
+        .annotate(
+            similarity=Greatest(TrigramWordSimilarity(q, "name"), TrigramWordSimilarity(q, "brand")),
+            rank=F("similarity")
+            + Value(settings.AUTOCOMPLETE_POPULARITY_WEIGHT)
+            * Ln(Value(1.0) + F("popularity") / Value(_popularity_scale()), output_field=FloatField()),
+        )
+        .order_by("-rank", "name")
+        .values("id", "name", "brand", "category", "unit", "price")[:limit]
+    )
+    # The router may pick a different replica on each lookup; the threshold is
+    # transaction-local, so both statements must run on the same connection.
+    db = products.db
+    products = products.using(db)
+    category_names = _category_names()
+    with transaction.atomic(using=db):
+        with connections[db].cursor() as cursor:
+            # The index answers "<%" for pairs above this threshold (default 0.6).
+            cursor.execute(
+                "SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)",
+                [str(settings.AUTOCOMPLETE_MIN_SIMILARITY)],
+            )
+            rows = list(products)
+            cursor.execute(
+                CATEGORY_SQL, [category_names, q, q, settings.AUTOCOMPLETE_CATEGORY_LIMIT]
+            )
+            categories = [category for (category,) in cursor.fetchall()]
+    return {
+        "products": [{**row, "id": str(row["id"]), "price": str(row["price"])} for row in rows],
+        "categories": categories,
+    }
+
+
+def suggest(q, limit=None):
+    """
+    Autocomplete suggestions for ``q``. Answers are cached per catalogue
+    version, first in this process and then in the shared cache, so repeated
+    prefixes never reach Postgres.
+    """
+    q = normalize(q)
+    limit = max(1, min(limit or settings.AUTOCOMPLETE_LIMIT, settings.AUTOCOMPLETE_MAX_LIMIT))
+    if len(q) < MIN_LENGTH:
+        return {"products": [], "categories": []}
+    key = f"catalogue:autocomplete:v{catalogue_version()}:{limit}:{q}"
+    result = _local.get(key)
+    if result is not None:
+        return result
+    result = cache.get(key)
+    if result is None:
+        result = search(q, limit)
+        cache.set(key, result, timeout=settings.AUTOCOMPLETE_CACHE_TTL)
+    _local.set(key, result)
+    return result
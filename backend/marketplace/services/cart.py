@@ -0,0 +1,218 @@
+import json
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from marketplace.models import Order, OrderItem, Product
+from . import shipping
+from .redis_client import after_commit, get_redis
+
+
+class CartError(Exception):
+    pass
+
+
+def _cart_key(user_id):
+    return f"cart:{user_id}"
+
+
+def _checkout_key(user_id):
+    return f"cart:{user_id}:checkout"
+
+
+def _snapshot_key(product_id):
+    return f"catalogue:product:{product_id}"
+
+
+def product_snapshot(product):
+    return {
+        "id": str(product.pk),
+        "seller": str(product.seller_id),
+        "name": product.name,
+        "unit": product.unit,
+        "price": str(product.price),
+        "weight_kg": str(product.weight_kg),
+    }
+
+
+def store_snapshot(product):
+    get_redis().set(
+        _snapshot_key(product.pk), json.dumps(product_snapshot(product)), ex=settings.CART_SNAPSHOT_TTL
+    )
+
+
+def drop_snapshot(product_id):
+    get_redis().delete(_snapshot_key(product_id))
+
+
+def get_snapshot(product_id):
+    """
+    Product price/seller snapshot from Redis. Snapshots are rewritten on every
+    product save and expire after CART_SNAPSHOT_TTL, so only an uncached
+    product falls through to Postgres.
+    """
+    raw = get_redis().get(_snapshot_key(product_id))
+    if raw is not None:
+        return json.loads(raw)
+    try:
+        product = Product.objects.get(pk=product_id)
+    except (Product.DoesNotExist, ValueError, ValidationError):
+        return None
+    store_snapshot(product)
+    return product_snapshot(product)
+
+
+def _lines(raw):
+    items = [json.loads(v) for v in raw.values()]
+    items.sort(key=lambda i: i["added_at"])
+    return items
+
+
+def get_cart(user_id):
+    items = _lines(get_redis().hgetall(_cart_key(user_id)))
+    subtotal = sum((Decimal(i["unit_price"]) * i["quantity"] for i in items), Decimal("0"))
+    return {"items": items, "subtotal": str(subtotal)}
+
+
+def set_item(user_id, product_id, quantity):
+    """Set a line's quantity (0 removes it), snapshotting the product's current price."""
+    key = _cart_key(user_id)
+    client = get_redis()
+    if quantity <= 0:
+        client.hdel(key, str(product_id))
+        return
+    snapshot = get_snapshot(product_id)
+    if snapshot is None:
+        raise CartError("Product not found.")
+    line = {
+        "product_id": snapshot["id"],
+        "seller": snapshot["seller"],
+        "name": snapshot["name"],
+        "unit": snapshot["unit"],
+        "weight_kg": snapshot["weight_kg"],
+        "unit_price": snapshot["price"],
+        "quantity": quantity,
+        "added_at": timezone.now().isoformat(),
+    }
+    pipe = client.pipeline(transaction=False)
+    pipe.hset(key, snapshot["id"], json.dumps(line))
+    pipe.expire(key, settings.CART_TTL)
+    pipe.execute()
+
+
+def clear(user_id):
+    get_redis().delete(_cart_key(user_id))
+
+
+def _take(user_id):
+    """
+    Atomically move the cart aside for checkout (RENAMENX), so a double submit
+    finds it gone instead of ordering the same lines twice.
+    """
+    from redis.exceptions import ResponseError
+
+    client = get_redis()
+    checkout_key = _checkout_key(user_id)
+    try:
+        taken = client.renamenx(_cart_key(user_id), checkout_key)
+    except ResponseError:  # no cart key at all
+        raise CartError("Cart is empty.")
+    if not taken:
+        raise CartError("A checkout for this cart is already in progress.")
+    client.expire(checkout_key, settings.CART_CHECKOUT_TIMEOUT)
+    return _lines(client.hgetall(checkout_key))
+
+
+def _give_back(user_id):
+    """Return a taken cart after a failed checkout, keeping lines added since."""
+    client = get_redis()
+    checkout_key = _checkout_key(user_id)
+    key = _cart_key(user_id)
+    pipe = client.pipeline(transaction=False)
+    for product_id, line in client.hgetall(checkout_key).items():
+        pipe.hsetnx(key, product_id, line)
+    pipe.expire(key, settings.CART_TTL)
+    pipe.delete(checkout_key)
+    pipe.execute()
+
+
+def checkout(user, delivery_method="pickup", delivery_address=None):
+    """
+    Turn the cart into one pending Order per seller, inserting all orders and
+    items with two bulk INSERTs in a single transaction. Lines are charged at
+    the product's current price, not the one shown when they were added. The
+    cart is taken before anything is built and handed back if checkout fails.
+    """
+    items = _take(user.pk)
+    try:
+        return _place_orders(user, items, delivery_method, delivery_address or {})
+    except Exception:
+        _give_back(user.pk)
+        raise
+
+
+def _place_orders(user, items, delivery_method, delivery_address):
+    if not items:
+        raise CartError("Cart is empty.")
+
+    by_seller = defaultdict(list)
+    for line in items:
+        by_seller[line["seller"]].append(line)
+
+    fees = {seller: Decimal("0.00") for seller in by_seller}
+    if delivery_method != "pickup":
+        weights = {
+            seller: sum((Decimal(l["weight_kg"]) * l["quantity"] for l in lines), Decimal("0"))
+            for seller, lines in by_seller.items()
+        }
+        try:
+            quote = shipping.quote(delivery_address, weights)
+        except shipping.ShippingUnavailable as exc:
+            raise CartError(str(exc))
+        fees = {q["seller"]: q["shipping_fee"] for q in quote["quotes"]}
+
+    with transaction.atomic():
+        # Charge today's price: a cart line can be up to CART_TTL old.
+        prices = {
+            str(pk): price
+            for pk, price in Product.objects.filter(
+                pk__in=[line["product_id"] for line in items]
+            ).values_list("pk", "price")
+        }
+        missing = [line["product_id"] for line in items if line["product_id"] not in prices]
+        if missing:
+            raise CartError(f"Products no longer available: {', '.join(missing)}")
+
+        orders, order_items = [], []
+        for seller_id, lines in by_seller.items():
+            subtotal = sum((prices[l["product_id"]] * l["quantity"] for l in lines), Decimal("0"))
+            order = Order(
+                buyer=user,
+                seller_id=seller_id,
+                subtotal=subtotal,
+                tax=Decimal("0"),
+                shipping_fee=fees[seller_id],
+                total=subtotal + fees[seller_id],
+                delivery_method=delivery_method,
+                delivery_address=delivery_address,
+            )
+            orders.append(order)
+            for line in lines:
+                unit_price = prices[line["product_id"]]
+                order_items.append(
+                    OrderItem(
+                        order=order,
+                        product_id=line["product_id"],
+                        quantity=line["quantity"],
+                        unit_price=unit_price,
+                        line_total=unit_price * line["quantity"],
+                    )
+                )
+        Order.objects.bulk_create(orders)
+        OrderItem.objects.bulk_create(order_items)
+        after_commit(lambda: get_redis().delete(_checkout_key(user.pk)))
+    return orders
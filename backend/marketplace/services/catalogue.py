@@ -0,0 +1,113 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, Min, Q
+
+VERSION_KEY = "catalogue:version"
+FACET_PARAMS = ("category", "seller", "search")
+
+
+def catalogue_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, 1, timeout=None)
+        version = cache.get(VERSION_KEY, 1)
+    return version
+
+
+def bump_catalogue_version():
+    try:
+        return cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 2, timeout=None)
+        return 2
+
+
+def facet_cache_key(params):
+    """Cache key for a facet set, scoped to the current catalogue version."""
+    relevant = {k: params[k] for k in FACET_PARAMS if params.get(k)}
+    digest = hashlib.sha1(json.dumps(relevant, sort_keys=True).encode()).hexdigest()
+    return f"catalogue:facets:v{catalogue_version()}:{digest}"
+
+
+def response_cache_key(request):
+    """
+    Per-version key under which CompressionMiddleware keeps the compressed
+    bytes of a catalogue GET, so a page is compressed once per catalogue
+    version instead of on every request.
+    """
+    digest = hashlib.sha1(request.get_full_path().encode()).hexdigest()
+    return f"catalogue:http:v{catalogue_version()}:{digest}"
+
+
+def compute_facets(queryset):
+    """
+    Build category/brand counts, price range and in-stock count for a product
+    queryset in a single GROUP BY (category, brand) pass.
+    """
+    rows = (
+        queryset.order_by()
+        .values("category", "brand")
+        .annotate(
+            count=Count("id"),
+            in_stock=Count("id", filter=Q(stock__gt=0)),
+            min_price=Min("price"),
+            max_price=Max("price"),
+        )
+    )
+    categories, brands = {}, {}
+    total = in_stock = 0
+    min_price = max_price = None
+    for row in rows:
+        categories[row["category"]] = categories.get(row["category"], 0) + row["count"]
+        if row["brand"]:
+            brands[row["brand"]] = brands.get(row["brand"], 0) + row["count"]
+        total += row["count"]
+        in_stock += row["in_stock"]
+        if min_price is None or row["min_price"] < min_price:
+            min_price = row["min_price"]
+        if max_price is None or row["max_price"] > max_price:
+            max_price = row["max_price"]
+    return {
+        "total": total,
+        "in_stock": in_stock,
+        "price": {
+            "min": str(min_price) if min_price is not None else None,
+            "max": str(max_price) if max_price is not None else None,
+        },
+        "categories": [
+            {"value": k, "count": v}
+            for k, v in sorted(categories.items(), key=lambda kv: (-kv[1], kv[0]))
+        ],
+        "brands": [
+            {"value": k, "count": v}
+            for k, v in sorted(brands.items(), key=lambda kv: (-kv[1], kv[0]))
+        ],
+    }
+
+
+def cached_facets(queryset, params):
+    key = facet_cache_key(params)
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_facets(queryset)
+        cache.set(key, facets, timeout=settings.CATALOGUE_FACETS_TTL)
+    return facets
+
+
+def warm_facets():
+    """Precompute the unfiltered facet set and one per category."""
+    from marketplace.models import Product
+
+    products = Product.objects.all()
+    cached_facets(products, {})
+    categories = (
+        products.order_by().values_list("category", flat=True).distinct()
+    )
+    warmed = 1
+    for category in categories:
+        cached_facets(products.filter(category=category), {"category": category})
+        warmed += 1
+    return warmed
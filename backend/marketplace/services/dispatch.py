@@ -0,0 +1,199 @@
+import math
+from collections import defaultdict
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from marketplace.models import DeliveryRun, Order
+from .orders import bulk_change_status
+
+NUMBER = r"^\s*-?[0-9]+(\.[0-9]+)?\s*$"
+
+# DBSCAN groups drops that are within DISPATCH_CLUSTER_RADIUS_M of each
+# other; clusters too big for one vehicle are split with k-means so no group
+# is much larger than DISPATCH_MAX_STOPS. Coordinates come back projected to
+# DISPATCH_SRID (metres), so routing can use plain Euclidean distance.
+CLUSTER_SQL = f"""
+    WITH drops AS (
+        SELECT id, ST_Transform(
+            ST_SetSRID(ST_MakePoint(
+                (delivery_address->>'lng')::float, (delivery_address->>'lat')::float
+            ), 4326), %(srid)s
+        ) AS geom
+        FROM marketplace_order
+        WHERE seller_id = %(seller)s
+          AND status = 'confirmed'
+          AND delivery_method <> 'pickup'
+          AND delivery_run_id IS NULL
+          AND confirmed_at < %(until)s
+          AND delivery_address->>'lat' ~ '{NUMBER}'
+          AND delivery_address->>'lng' ~ '{NUMBER}'
+    ),
+    dense AS (
+        SELECT id, geom, ST_ClusterDBSCAN(geom, eps := %(eps)s, minpoints := 1) OVER () AS cluster
+        FROM drops
+    ),
+    sized AS (
+        SELECT id, geom, cluster, count(*) OVER (PARTITION BY cluster) AS size FROM dense
+    )
+    SELECT id, ST_X(geom), ST_Y(geom), cluster,
+           ST_ClusterKMeans(geom, CEIL(size::float / %(max_stops)s)::int) OVER (PARTITION BY cluster)
+    FROM sized
+"""
+
+DEPOT_SQL = """
+    SELECT ST_X(p), ST_Y(p) FROM (
+        SELECT ST_Transform(pickup_location::geometry, %s) AS p
+        FROM marketplace_seller WHERE id = %s AND pickup_location IS NOT NULL
+    ) depot
+"""
+
+
+class DispatchError(Exception):
+    pass
+
+
+def _distance(a, b):
+    return math.hypot(a[0] - b[0], a[1] - b[1])
+
+
+def _path_length(depot, points, route):
+    total, previous = 0.0, depot
+    for index in route:
+        total += _distance(previous, points[index])
+        previous = points[index]
+    return total
+
+
+def nearest_neighbour(depot, points):
+    """Greedy open route from ``depot`` visiting every point once."""
+    remaining = set(range(len(points)))
+    route, current = [], depot
+    while remaining:
+        nearest = min(remaining, key=lambda i: _distance(current, points[i]))
+        remaining.remove(nearest)
+        route.append(nearest)
+        current = points[nearest]
+    return route
+
+
+def two_opt(depot, points, route, max_passes=None):
+    """
+    Improve an open route (fixed start at the depot, free end) by reversing
+    segments while that shortens it. Bounded by DISPATCH_TWO_OPT_PASSES.
+    """
+    max_passes = max_passes or settings.DISPATCH_TWO_OPT_PASSES
+    nodes = [depot] + [points[i] for i in route]
+    order = [None] + list(route)
+    n = len(nodes)
+    for _ in range(max_passes):
+        improved = False
+        for i in range(1, n - 1):
+            for k in range(i + 1, n):
+                a, b = nodes[i - 1], nodes[i]
+                c = nodes[k]
+                before = _distance(a, b)
+                after = _distance(a, c)
+                if k + 1 < n:
+                    d = nodes[k + 1]
+                    before += _distance(c, d)
+                    after += _distance(b, d)
+                if after < before - 1e-6:
+                    nodes[i:k + 1] = nodes[i:k + 1][::-1]
+                    order[i:k + 1] = order[i:k + 1][::-1]
+                    improved = True
+        if not improved:
+            break
+    return order[1:]
+
+
+def route(depot, points):
+    """Stop order for ``points`` starting from ``depot`` (nearest neighbour + 2-opt)."""
+    if depot is None:
+        depot = (
+            sum(p[0] for p in points) / len(points),
+            sum(p[1] for p in points) / len(points),
+        )
+    return two_opt(depot, points, nearest_neighbour(depot, points)), depot
+
+
+def _groups(seller_id, until):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            CLUSTER_SQL,
+            {
+                "srid": settings.DISPATCH_SRID,
+                "seller": str(seller_id),
+                "until": until,
+                "eps": settings.DISPATCH_CLUSTER_RADIUS_M,
+                "max_stops": settings.DISPATCH_MAX_STOPS,
+            },
+        )
+        rows = cursor.fetchall()
+        cursor.execute(DEPOT_SQL, [settings.DISPATCH_SRID, str(seller_id)])
+        depot = cursor.fetchone()
+    groups = defaultdict(list)
+    for order_id, x, y, cluster, part in rows:
+        groups[(cluster, part)].append((order_id, (x, y)))
+    return list(groups.values()), depot
+
+
+@transaction.atomic
+def plan(seller, date):
+    """
+    Replace the seller's planned (not yet dispatched) runs for ``date`` with
+    new ones covering every confirmed delivery order confirmed before the end
+    of that day. Each spatial group is routed and cut into runs of at most
+    DISPATCH_MAX_STOPS consecutive stops.
+    """
+    stale = DeliveryRun.objects.filter(seller=seller, date=date, status=DeliveryRun.STATUS_PLANNED)
+    Order.objects.filter(delivery_run__in=stale).update(delivery_run=None, run_sequence=None)
+    stale.delete()
+
+    until = datetime.combine(date + timedelta(days=1), time.min, tzinfo=dt_timezone.utc)
+    groups, depot = _groups(seller.pk, until)
+    runs, assignments = [], []
+    max_stops = settings.DISPATCH_MAX_STOPS
+    for group in groups:
+        order_ids = [order_id for order_id, _ in group]
+        points = [point for _, point in group]
+        stops, start = route(depot, points)
+        for offset in range(0, len(stops), max_stops):
+            chunk = stops[offset:offset + max_stops]
+            metres = _path_length(start, points, chunk)
+            run = DeliveryRun(
+                seller=seller,
+                date=date,
+                stop_count=len(chunk),
+                distance_km=Decimal(metres / 1000).quantize(Decimal("0.01")),
+            )
+            runs.append(run)
+            assignments.extend(
+                (order_ids[index], run, sequence) for sequence, index in enumerate(chunk, start=1)
+            )
+    DeliveryRun.objects.bulk_create(runs)
+    orders = [
+        Order(pk=order_id, delivery_run=run, run_sequence=sequence)
+        for order_id, run, sequence in assignments
+    ]
+    Order.objects.bulk_update(orders, ["delivery_run", "run_sequence"], batch_size=500)
+    return runs
+
+
+@transaction.atomic
+def dispatch(run):
+    """Mark a planned run dispatched and move all its confirmed stops to ``dispatched``."""
+    run = DeliveryRun.objects.select_for_update().get(pk=run.pk)
+    if run.status != DeliveryRun.STATUS_PLANNED:
+        raise DispatchError("This run has already been dispatched.")
+    orders = list(
+        run.stops.filter(status="confirmed").select_related("buyer", "seller").order_by("run_sequence")
+    )
+    bulk_change_status(orders, "dispatched")
+    run.status = DeliveryRun.STATUS_DISPATCHED
+    run.dispatched_at = timezone.now()
+    run.save(update_fields=["status", "dispatched_at"])
+    return run
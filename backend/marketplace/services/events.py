@@ -0,0 +1,54 @@
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .redis_client import after_commit, get_redis
+
+
+def user_stream(user_id):
+    return f"events:user:{user_id}"
+
+
+def seller_stream(seller_id):
+    return f"events:seller:{seller_id}"
+
+
+def publish(streams, event, data):
+    """
+    Append an event to each Redis stream. Streams (rather than plain pub/sub)
+    keep a short backlog so SSE clients can resume from their Last-Event-ID.
+    """
+    body = json.dumps(data, cls=DjangoJSONEncoder)
+    pipe = get_redis().pipeline(transaction=False)
+    for stream in streams:
+        pipe.xadd(
+            stream,
+            {"event": event, "data": body},
+            maxlen=settings.EVENT_STREAM_MAXLEN,
+            approximate=True,
+        )
+    pipe.execute()
+
+
+def publish_order_event(order, event="order.status"):
+    data = {
+        "order": str(order.pk),
+        "status": order.status,
+        "total": order.total,
+        "updated_at": order.updated_at,
+    }
+    streams = [user_stream(order.buyer_id), seller_stream(order.seller_id)]
+    after_commit(lambda: publish(streams, event, data))
+
+
+def publish_payment_event(payment, event="payment.status"):
+    order = payment.order
+    data = {
+        "payment": str(payment.pk),
+        "order": str(order.pk),
+        "status": payment.status,
+        "tx_ref": payment.tx_ref,
+    }
+    streams = [user_stream(order.buyer_id), seller_stream(order.seller_id)]
+    after_commit(lambda: publish(streams, event, data))
@@ -0,0 +1,118 @@
+import csv
+import io
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from marketplace.models import Seller, SellerInvitation, User
+from .outbox import invitation_events, record
+
+CSV_FIELDS = ("email", "phone", "role")
+
+# One round trip for every conflict in the upload: pending invitations to
+# this seller and existing accounts, matched on phone or (case-insensitive) email.
+CONFLICTS_SQL = f"""
+    SELECT 'pending', phone, lower(email) FROM {SellerInvitation._meta.db_table}
+    WHERE seller_id = %(seller)s AND status = 'pending'
+      AND (phone = ANY(%(phones)s) OR lower(email) = ANY(%(emails)s))
+    UNION ALL
+    SELECT 'account', phone, lower(email) FROM {User._meta.db_table}
+    WHERE phone = ANY(%(phones)s) OR lower(email) = ANY(%(emails)s)
+"""
+
+REASONS = {
+    ("pending", "phone"): "An invitation has already been sent to that phone number.",
+    ("pending", "email"): "An invitation has already been sent to that email.",
+    ("account", "phone"): "An account with that phone already exists.",
+    ("account", "email"): "An account with that email already exists.",
+    ("batch", "phone"): "That phone number appears earlier in this upload.",
+    ("batch", "email"): "That email appears earlier in this upload.",
+}
+
+
+class BulkInvitationError(Exception):
+    pass
+
+
+def read_rows(data, upload=None):
+    """Rows from an uploaded CSV (header: email,phone[,role]) or a JSON list."""
+    if upload is not None:
+        text = io.TextIOWrapper(upload, encoding="utf-8-sig", newline="")
+        reader = csv.reader(text)
+        header = [column.strip().lower() for column in next(reader, [])]
+        if not {"email", "phone"} <= set(header):
+            raise BulkInvitationError("The CSV needs a header row with email and phone columns.")
+        rows = [
+            {
+                column: value.strip()
+                for column, value in zip(header, line)
+                if column in CSV_FIELDS and value.strip()
+            }
+            for line in reader
+            if any(value.strip() for value in line)
+        ]
+    else:
+        rows = data.get("invitations") if isinstance(data, dict) else data
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise BulkInvitationError("Send a list of invitations or upload a CSV file.")
+    if not rows:
+        raise BulkInvitationError("No invitations to send.")
+    if len(rows) > settings.INVITATION_BULK_MAX_ROWS:
+        raise BulkInvitationError(f"At most {settings.INVITATION_BULK_MAX_ROWS} invitations per upload.")
+    return rows
+
+
+def _conflicts(seller, phones, emails):
+    taken = {}
+    with connection.cursor() as cursor:
+        cursor.execute(CONFLICTS_SQL, {"seller": str(seller.pk), "phones": phones, "emails": emails})
+        for source, phone, email in cursor.fetchall():
+            taken.setdefault(("phone", phone), source)
+            if email:
+                taken.setdefault(("email", email), source)
+    return taken
+
+
+def bulk_invite(seller, invited_by, rows):
+    """
+    Validate, deduplicate and create invitations for ``rows`` in one
+    transaction: one conflict query, one INSERT for the invitations and one
+    for their outbox notifications. Returns a result per row, in input order.
+    """
+    from marketplace.serializers import SellerInvitationSerializer
+
+    results, valid = [], []
+    for number, row in enumerate(rows, start=1):
+        serializer = SellerInvitationSerializer(data=row)
+        if serializer.is_valid():
+            valid.append((number, serializer.validated_data))
+            results.append(None)
+        else:
+            results.append({"row": number, "status": "invalid", "errors": serializer.errors})
+
+    with transaction.atomic():
+        # Serializes concurrent uploads for the same seller, so they can't both pass the check.
+        Seller.objects.select_for_update().filter(pk=seller.pk).first()
+        taken = _conflicts(
+            seller,
+            [data["phone"] for _, data in valid],
+            [data["email"].lower() for _, data in valid],
+        )
+        invitations = []
+        for number, data in valid:
+            keys = (("phone", data["phone"]), ("email", data["email"].lower()))
+            clash = next(((taken[key], key[0]) for key in keys if key in taken), None)
+            if clash is not None:
+                results[number - 1] = {"row": number, "status": "duplicate", "detail": REASONS[clash]}
+                continue
+            taken.update((key, "batch") for key in keys)
+            invitations.append(
+                (number, SellerInvitation(seller=seller, invited_by=invited_by, **data))
+            )
+        SellerInvitation.objects.bulk_create([invitation for _, invitation in invitations])
+        events = []
+        for number, invitation in invitations:
+            events.extend(invitation_events(invitation))
+            results[number - 1] = {"row": number, "status": "created", "id": invitation.pk}
+        record(events)
+    return results
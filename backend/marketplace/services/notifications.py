@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils.module_loading import import_string
+
+# Messages are dicts: {"key": ..., "to": ..., "subject": ..., "body": ...}.
+# ``key`` is stable across retries so providers (and the fake sink) can dedupe.
+
+
+class ConsoleSMSBackend:
+    def send_messages(self, messages):
+        for message in messages:
+            print(f"SMS to {message['to']} [{message['key']}]: {message['body']}")
+        return len(messages)
+
+
+class LocMemSMSBackend:
+    """Fake SMS sink for local runs and tests, mirroring Django's locmem mail backend."""
+
+    outbox = []
+
+    def send_messages(self, messages):
+        seen = {m["key"] for m in self.outbox}
+        fresh = [m for m in messages if m["key"] not in seen]
+        self.outbox.extend(fresh)
+        return len(fresh)
+
+
+def get_sms_backend():
+    return import_string(settings.SMS_BACKEND)()
+
+
+def send_sms(messages):
+    if messages:
+        get_sms_backend().send_messages(messages)
+
+
+def send_email(messages):
+    """Send every email over one connection; providers dedupe on Message-ID-like headers."""
+    if not messages:
+        return
+    emails = [
+        EmailMessage(
+            subject=m["subject"],
+            body=m["body"],
+            to=[m["to"]],
+            headers={"X-Idempotency-Key": m["key"]},
+        )
+        for m in messages
+    ]
+    get_connection(fail_silently=False).send_messages(emails)
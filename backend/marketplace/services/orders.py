@@ -0,0 +1,61 @@
+from django.db import transaction
+from django.db.models import Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from marketplace.models import Order
+from . import outbox
+from .events import publish_order_event
+
+# Statuses at or past confirmation; orders reaching one get confirmed_at once.
+CONFIRMED_STATUSES = ("confirmed", "dispatched", "delivered")
+
+
+def stamp_confirmed(order):
+    """Set confirmed_at the first time an order reaches a confirmed status."""
+    if order.confirmed_at is None and order.status in CONFIRMED_STATUSES:
+        order.confirmed_at = timezone.now()
+        return True
+    return False
+
+
+def change_status(order, status):
+    """Move an order to ``status`` and notify its buyer and seller."""
+    if order.status == status:
+        return order
+    with transaction.atomic():
+        order.status = status
+        order.updated_at = timezone.now()
+        fields = ["status", "updated_at"]
+        if stamp_confirmed(order):
+            fields.append("confirmed_at")
+        order.save(update_fields=fields)
+        outbox.notify_order_status(order)
+        publish_order_event(order)
+    return order
+
+
+def bulk_change_status(orders, status):
+    """
+    change_status for many orders: one UPDATE and one outbox insert. Orders
+    should come with buyer and seller loaded for the notifications.
+    """
+    orders = [order for order in orders if order.status != status]
+    if not orders:
+        return orders
+    now = timezone.now()
+    fields = {"status": status, "updated_at": now}
+    if status in CONFIRMED_STATUSES:
+        fields["confirmed_at"] = Coalesce("confirmed_at", Value(now))
+    with transaction.atomic():
+        Order.objects.filter(pk__in=[order.pk for order in orders]).update(**fields)
+        events = []
+        for order in orders:
+            order.status = status
+            order.updated_at = now
+            if "confirmed_at" in fields and order.confirmed_at is None:
+                order.confirmed_at = now
+            events.extend(outbox.order_status_events(order))
+            publish_order_event(order)
+        outbox.record(events)
+    return orders
@@ -0,0 +1,168 @@
+import hashlib
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from marketplace.models import OutboxEvent
+from .notifications import send_email, send_sms
+
+ORDER_STATUS = "order.status"
+SELLER_INVITATION = "seller.invitation"
+SUBJECTS = {ORDER_STATUS: "Your LMGa order", SELLER_INVITATION: "Your LMGa team invitation"}
+
+
+def record(events):
+    """
+    Queue notifications in the caller's transaction. Each event is a tuple of
+    (kind, channel, recipient, payload, dedupe_key); re-recording an existing
+    dedupe_key is a no-op.
+    """
+    OutboxEvent.objects.bulk_create(
+        [
+            OutboxEvent(kind=kind, channel=channel, recipient=recipient, payload=payload, dedupe_key=key)
+            for kind, channel, recipient, payload, key in events
+            if recipient
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def _contacts(phone, email):
+    contacts = [(OutboxEvent.CHANNEL_SMS, phone)]
+    if email:
+        contacts.append((OutboxEvent.CHANNEL_EMAIL, email))
+    return contacts
+
+
+def order_status_events(order):
+    payload = {"order": str(order.pk), "status": order.status}
+    buyer, seller = order.buyer, order.seller
+    events = []
+    for audience, phone, email in (
+        ("buyer", buyer.phone, buyer.email),
+        ("seller", seller.phone, seller.email),
+    ):
+        for channel, recipient in _contacts(phone, email):
+            key = f"order:{order.pk}:{order.status}:{audience}:{channel}"
+            events.append((ORDER_STATUS, channel, recipient, {**payload, "audience": audience}, key))
+    return events
+
+
+def invitation_events(invitation):
+    payload = {
+        "seller": invitation.seller.business_name,
+        "link": f"{settings.FRONTEND_URL}/invite/{invitation.token}",
+    }
+    return [
+        (SELLER_INVITATION, channel, recipient, payload, f"invitation:{invitation.pk}:{channel}")
+        for channel, recipient in _contacts(invitation.phone, invitation.email)
+    ]
+
+
+def notify_order_status(order):
+    record(order_status_events(order))
+
+
+def notify_invitation(invitation):
+    record(invitation_events(invitation))
+
+
+def _line(event):
+    payload = event.payload
+    if event.kind == ORDER_STATUS:
+        return f"Order {payload['order'][:8]} is now {payload['status']}."
+    if event.kind == SELLER_INVITATION:
+        return f"You have been invited to join {payload['seller']} on LMGa: {payload['link']}"
+    return str(payload)
+
+
+def render(channel, recipient, events):
+    """Coalesce every pending event for one recipient into a single message."""
+    lines = [_line(e) for e in events]
+    key = hashlib.sha1(",".join(str(e.pk) for e in events).encode()).hexdigest()
+    kinds = {e.kind for e in events}
+    subject = SUBJECTS.get(kinds.pop(), "LMGa update") if len(kinds) == 1 else "LMGa updates"
+    return {"key": key, "to": recipient, "subject": subject, "body": "\n".join(lines)}
+
+
+SENDERS = {OutboxEvent.CHANNEL_SMS: send_sms, OutboxEvent.CHANNEL_EMAIL: send_email}
+
+
+def _claim(batch_size, now):
+    """
+    Lease up to ``batch_size`` due events in one short transaction. SKIP LOCKED
+    lets several dispatchers run side by side, and pushing available_at out by
+    OUTBOX_CLAIM_SECONDS keeps others off them while they are being sent; a
+    dispatcher that dies mid-send just lets the lease run out.
+    """
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True)
+            .filter(sent_at__isnull=True, failed_at__isnull=True, available_at__lte=now)
+            .order_by("id")[:batch_size]
+        )
+        OutboxEvent.objects.filter(pk__in=[e.pk for e in events]).update(
+            available_at=now + timedelta(seconds=settings.OUTBOX_CLAIM_SECONDS)
+        )
+    return events
+
+
+def _send(channel, batch):
+    """
+    Send ``batch`` of (message, events) pairs and return (events, error) pairs.
+    A failed batch is retried one message at a time, so a single bad recipient
+    only fails its own events.
+    """
+    try:
+        SENDERS[channel]([message for message, _ in batch])
+    except Exception as exc:  # provider errors of any kind are retried
+        if len(batch) == 1:
+            return [(batch[0][1], exc)]
+        return [result for item in batch for result in _send(channel, [item])]
+    return [(group, None) for _, group in batch]
+
+
+def dispatch(batch_size=None):
+    """
+    Drain one batch of due events. Rows are claimed in a short transaction and
+    sent outside it, so no locks or connection are held across provider calls.
+    Events are only marked sent after the provider accepts them, so delivery
+    is at-least-once and the stable message key lets the provider drop
+    repeats. An event that fails OUTBOX_MAX_ATTEMPTS times is parked with
+    failed_at set.
+    """
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    events = _claim(batch_size, timezone.now())
+    grouped = defaultdict(list)
+    for event in events:
+        grouped[(event.channel, event.recipient)].append(event)
+
+    by_channel = defaultdict(list)
+    for (channel, recipient), group in grouped.items():
+        by_channel[channel].append((render(channel, recipient, group), group))
+
+    sent, failed = [], []
+    for channel, batch in by_channel.items():
+        for group, error in _send(channel, batch):
+            now = timezone.now()
+            for event in group:
+                if error is None:
+                    event.sent_at = now
+                    sent.append(event)
+                    continue
+                event.attempts += 1
+                event.last_error = str(error)[:1000]
+                if event.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                    event.failed_at = now
+                else:
+                    event.available_at = now + timedelta(
+                        seconds=min(2 ** event.attempts, settings.OUTBOX_MAX_BACKOFF)
+                    )
+                failed.append(event)
+
+    OutboxEvent.objects.bulk_update(sent, ["sent_at"])
+    OutboxEvent.objects.bulk_update(failed, ["attempts", "last_error", "available_at", "failed_at"])
+    return len(sent)
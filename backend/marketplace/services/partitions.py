@@ -0,0 +1,74 @@
+from datetime import date, datetime, timezone
+
+from django.conf import settings
+from django.db import connection
+
+PARTITIONED_TABLES = ("marketplace_payment",)
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_bounds(month):
+    """UTC [start, end) datetimes for the month containing ``month``."""
+    start = month_start(month)
+    end = add_months(start, 1)
+    return (
+        datetime(start.year, start.month, 1, tzinfo=timezone.utc),
+        datetime(end.year, end.month, 1, tzinfo=timezone.utc),
+    )
+
+
+def partition_name(table, month):
+    return f"{table}_p{month:%Y_%m}"
+
+
+def existing_partitions(table):
+    """Months that already have a partition of ``table``."""
+    prefix = f"{table}_p"
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = %s
+            """,
+            [table],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    months = []
+    for name in names:
+        if name.startswith(prefix):
+            year, month = name[len(prefix):].split("_")
+            months.append(date(int(year), int(month), 1))
+    return sorted(months)
+
+
+def ensure_partitions(months_ahead=None, today=None):
+    """Create any missing monthly partitions from this month to ``months_ahead``."""
+    months_ahead = settings.PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    current = month_start(today or datetime.now(timezone.utc))
+    created = []
+    for table in PARTITIONED_TABLES:
+        have = set(existing_partitions(table))
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            if month in have:
+                continue
+            start, end = month_bounds(month)
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'CREATE TABLE IF NOT EXISTS "{partition_name(table, month)}" '
+                    f'PARTITION OF "{table}" FOR VALUES FROM (%s) TO (%s)',
+                    [start, end],
+                )
+            created.append(partition_name(table, month))
+    return created
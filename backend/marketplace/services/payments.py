@@ -1,6 +1,43 @@
+import json
+import re
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+
 import requests
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .redis_client import after_commit, get_redis
+
+# KEYS[1]: a provider's lease set. ARGV: lease seconds, limit, token.
+# Expired leases (crashed workers) are dropped before counting.
+ACQUIRE_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - tonumber(ARGV[1]))
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[2]) then
+    redis.call('ZADD', KEYS[1], now, ARGV[3])
+    redis.call('EXPIRE', KEYS[1], math.ceil(tonumber(ARGV[1])) + 1)
+    return 1
+end
+return 0
+"""
+
+_acquire = None
+
+# Tanzanian mobile numbers: 255 / +255 / 0, then 6xx or 7xx and 7 more digits.
+MSISDN = re.compile(r"^(?:\+?255|0)([67]\d{8})$")
+
+
+class ProviderBusy(Exception):
+    pass
+
 
 class PaymentGateway:
+    PROVIDERS = ("mpesa", "tigopesa", "airtelmoney")
+
     def __init__(self, provider:str):
         self.provider = provider.lower()
 
@@ -26,3 +63,108 @@ class PaymentGateway:
     def _airtel_collect(self, phone, amount, tx_ref):
         print("Simulating Airtel Money:", phone, amount)
         return {"status":"pending","tx_ref":tx_ref}
+
+
+def normalize_msisdn(phone):
+    """``phone`` as 255XXXXXXXXX, or None if it isn't a Tanzanian mobile number."""
+    match = MSISDN.match(re.sub(r"[\s-]", "", str(phone or "")))
+    return f"255{match.group(1)}" if match else None
+
+
+def new_tx_ref():
+    return f"LMGA-{uuid.uuid4().hex[:20].upper()}"
+
+
+@contextmanager
+def provider_slot(provider):
+    """
+    Hold one of the provider's PAYMENT_PROVIDER_LIMITS concurrent initiation
+    slots (a Redis lease set shared by all workers), or raise ProviderBusy.
+    """
+    global _acquire
+    if _acquire is None:
+        _acquire = get_redis().register_script(ACQUIRE_LUA)
+    key = f"payments:slots:{provider}"
+    token = uuid.uuid4().hex
+    limit = settings.PAYMENT_PROVIDER_LIMITS.get(provider, settings.PAYMENT_PROVIDER_CONCURRENCY)
+    if not _acquire(keys=[key], args=[settings.PAYMENT_INITIATION_LEASE, limit, token]):
+        raise ProviderBusy(provider)
+    try:
+        yield
+    finally:
+        get_redis().zrem(key, token)
+
+
+def status_channel(payment_id):
+    return f"payments:status:{payment_id}"
+
+
+def resolution(payment):
+    return {"id": str(payment.pk), "status": payment.status, "tx_ref": payment.tx_ref}
+
+
+def publish_resolution(payment):
+    """
+    After commit, store the final status and wake long-pollers parked on
+    /api/payments/<id>/wait/. The key covers waiters that subscribe late.
+    """
+    body = json.dumps(resolution(payment))
+    channel = status_channel(payment.pk)
+
+    def publish():
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.set(channel, body, ex=settings.PAYMENT_STATUS_TTL)
+        pipe.publish(channel, body)
+        pipe.execute()
+
+    after_commit(publish)
+
+
+def fail(payment, reason):
+    from .events import publish_payment_event
+
+    with transaction.atomic():
+        updated = type(payment).objects.filter(pk=payment.pk, status="pending").update(
+            status="failed", payload={**payment.payload, "error": reason}
+        )
+        if updated:
+            payment.status = "failed"
+            publish_payment_event(payment)
+            publish_resolution(payment)
+
+
+def initiate(payment_id):
+    """
+    Push the payment request to the operator. Runs in a Celery worker with a
+    per-provider concurrency cap; operator timeouts propagate so the task can
+    retry. The outcome arrives later through payment_webhook.
+    """
+    from marketplace.models import Payment
+
+    payment = Payment.objects.select_related("order__buyer").get(pk=payment_id)
+    if payment.status != "pending" or "initiated_at" in payment.payload:
+        return payment
+    if timezone.now() - payment.created_at > timedelta(seconds=settings.PAYMENT_INITIATION_TIMEOUT):
+        fail(payment, "Payment could not be started in time.")
+        return payment
+    phone = payment.payload.get("msisdn") or payment.order.buyer.phone
+    amount = int(payment.amount)
+    if amount != payment.amount:
+        # Operators take whole shillings; never charge a truncated amount.
+        fail(payment, f"Amount {payment.amount} is not a whole number of shillings.")
+        return payment
+    with provider_slot(payment.provider):
+        try:
+            result = PaymentGateway(payment.provider).initiate_payment(phone, amount, payment.tx_ref)
+        except requests.RequestException:
+            raise
+        except Exception as exc:
+            fail(payment, str(exc))
+            return payment
+    if result.get("status") == "failed":
+        fail(payment, result.get("error") or "Declined by provider.")
+        return payment
+    payload = {**payment.payload, "initiation": result, "initiated_at": timezone.now().isoformat()}
+    # Don't overwrite a webhook that already resolved the payment.
+    Payment.objects.filter(pk=payment.pk, status="pending").update(payload=payload)
+    return payment
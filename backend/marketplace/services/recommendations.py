@@ -0,0 +1,213 @@
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from marketplace.models import JobCursor, Order, OrderItem, Product, ProductAffinity
+from .catalogue import catalogue_version
+
+CURSOR_NAME = "recommendations"
+# Each order adds 2 ** (age / half-life) measured from EPOCH instead of
+# decaying every stored score on each run: newer orders weigh exponentially
+# more, and the ranking within a product is the same either way.
+EPOCH = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+UPSERT_BATCH = 1000
+
+UPSERT_SQL = """
+    INSERT INTO marketplace_productaffinity (product_id, related_id, score, updated_at)
+    VALUES {values}
+    ON CONFLICT (product_id, related_id) DO UPDATE
+    SET score = marketplace_productaffinity.score + EXCLUDED.score,
+        updated_at = EXCLUDED.updated_at
+"""
+
+POPULARITY_SQL = """
+    UPDATE marketplace_product p SET popularity = p.popularity + v.weight
+    FROM (VALUES {values}) AS v(id, weight)
+    WHERE p.id = v.id
+"""
+
+PRUNE_SQL = """
+    DELETE FROM marketplace_productaffinity a
+    USING (
+        SELECT id, row_number() OVER (PARTITION BY product_id ORDER BY score DESC, id) AS rank
+        FROM marketplace_productaffinity
+        WHERE product_id = ANY(%s)
+    ) ranked
+    WHERE a.id = ranked.id AND ranked.rank > %s
+"""
+
+
+def order_weight(confirmed_at):
+    half_life = settings.RECOMMENDATION_HALF_LIFE_DAYS * 86400
+    return 2.0 ** ((confirmed_at - EPOCH).total_seconds() / half_life)
+
+
+def _order_chunks(since, until, chunk_size):
+    """Yield {order_id: confirmed_at} pages of confirmed orders, keyset-paginated."""
+    orders = Order.objects.filter(confirmed_at__lte=until).exclude(status="cancelled")
+    if since is not None:
+        orders = orders.filter(confirmed_at__gt=since)
+    last = None
+    while True:
+        page = orders
+        if last is not None:
+            page = page.filter(Q(confirmed_at__gt=last[1]) | Q(confirmed_at=last[1], id__gt=last[0]))
+        rows = list(page.order_by("confirmed_at", "id").values_list("id", "confirmed_at")[:chunk_size])
+        if not rows:
+            return
+        yield dict(rows)
+        last = rows[-1]
+
+
+def _baskets(chunk):
+    """(weight, products) for each order in the chunk."""
+    baskets = defaultdict(set)
+    items = OrderItem.objects.filter(order_id__in=list(chunk), product__isnull=False)
+    for order_id, product_id in items.values_list("order_id", "product_id"):
+        baskets[order_id].add(product_id)
+    return [(order_weight(chunk[order_id]), products) for order_id, products in baskets.items()]
+
+
+def _pairs(weight, products):
+    """(product, related, weight) for every ordered pair bought in the same order."""
+    if len(products) > 1:
+        # Cap very large baskets: pairs grow quadratically and say little.
+        products = sorted(products)[: settings.RECOMMENDATION_MAX_BASKET]
+        for product in products:
+            for related in products:
+                if product != related:
+                    yield product, related, weight
+
+
+def _upsert(scores):
+    now = timezone.now()
+    rows = list(scores.items())
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), UPSERT_BATCH):
+            batch = rows[start:start + UPSERT_BATCH]
+            values = ", ".join(["(%s, %s, %s, %s)"] * len(batch))
+            params = [v for (product, related), score in batch for v in (product, related, score, now)]
+            cursor.execute(UPSERT_SQL.format(values=values), params)
+
+
+def _add_popularity(weights):
+    rows = list(weights.items())
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), UPSERT_BATCH):
+            batch = rows[start:start + UPSERT_BATCH]
+            values = ", ".join(["(%s::uuid, %s::float)"] * len(batch))
+            cursor.execute(
+                POPULARITY_SQL.format(values=values), [v for row in batch for v in row]
+            )
+
+
+def _prune(product_ids):
+    """Keep only the RECOMMENDATION_KEEP best pairs for each product."""
+    product_ids = list(product_ids)
+    with connection.cursor() as cursor:
+        for start in range(0, len(product_ids), UPSERT_BATCH):
+            cursor.execute(
+                PRUNE_SQL, [product_ids[start:start + UPSERT_BATCH], settings.RECOMMENDATION_KEEP]
+            )
+
+
+def mine(since, until, chunk_size=None):
+    """
+    Add co-occurrence scores and product popularity for orders confirmed in
+    (since, until]. Orders are read a page at a time and scores are flushed every
+    RECOMMENDATION_FLUSH_PAIRS pairs, so memory stays bounded however much
+    history is scanned. Returns (orders scanned, products touched).
+    """
+    chunk_size = chunk_size or settings.RECOMMENDATION_CHUNK_SIZE
+    scores = defaultdict(float)
+    popularity = defaultdict(float)
+    touched = set()
+    scanned = 0
+    for chunk in _order_chunks(since, until, chunk_size):
+        scanned += len(chunk)
+        for weight, products in _baskets(chunk):
+            for product in products:
+                popularity[product] += weight
+            for product, related, pair_weight in _pairs(weight, products):
+                scores[(product, related)] += pair_weight
+        if len(scores) + len(popularity) >= settings.RECOMMENDATION_FLUSH_PAIRS:
+            touched.update(product for product, _ in scores)
+            _upsert(scores)
+            _add_popularity(popularity)
+            scores.clear()
+            popularity.clear()
+    touched.update(product for product, _ in scores)
+    _upsert(scores)
+    _add_popularity(popularity)
+    _prune(touched)
+    return scanned, touched
+
+
+def _mining_upper_bound():
+    # Stay behind "now" so orders confirmed in still-open transactions aren't skipped.
+    return timezone.now() - timedelta(seconds=settings.RECOMMENDATION_MINING_LAG)
+
+
+def mine_new_orders():
+    """Incremental run from the stored cursor; the row lock keeps runs serial."""
+    until = _mining_upper_bound()
+    with transaction.atomic():
+        cursor, _ = JobCursor.objects.select_for_update().get_or_create(name=CURSOR_NAME)
+        if cursor.position is not None and cursor.position >= until:
+            return 0
+        scanned, touched = mine(cursor.position, until)
+        cursor.position = until
+        cursor.save(update_fields=["position", "updated_at"])
+    forget(touched)
+    return scanned
+
+
+def rebuild(chunk_size=None):
+    """Recompute the whole table from order history in one transaction."""
+    until = _mining_upper_bound()
+    with transaction.atomic():
+        cursor, _ = JobCursor.objects.select_for_update().get_or_create(name=CURSOR_NAME)
+        previous = set(ProductAffinity.objects.values_list("product_id", flat=True).distinct())
+        ProductAffinity.objects.all().delete()
+        Product.objects.filter(popularity__gt=0).update(popularity=0)
+        scanned, touched = mine(None, until, chunk_size)
+        cursor.position = until
+        cursor.save(update_fields=["position", "updated_at"])
+    forget(previous | touched)
+    return scanned, len(touched)
+
+
+def _related_key(product_id, version=None):
+    return f"recommendations:v{version or catalogue_version()}:{product_id}"
+
+
+def forget(product_ids):
+    version = catalogue_version()
+    keys = [_related_key(pk, version) for pk in product_ids]
+    for start in range(0, len(keys), UPSERT_BATCH):
+        cache.delete_many(keys[start:start + UPSERT_BATCH])
+
+
+def cached_related(product_id, compute):
+    """Serialized related products for ``product_id``; ``compute`` fills a miss."""
+    key = _related_key(product_id)
+    data = cache.get(key)
+    if data is None:
+        data = compute()
+        cache.set(key, data, timeout=settings.RECOMMENDATION_CACHE_TTL)
+    return data
+
+
+def related_products(product_id):
+    """In-stock products most often bought with ``product_id``, best first."""
+    rows = (
+        ProductAffinity.objects.filter(product_id=product_id, related__stock__gt=0)
+        .select_related("related")
+        .order_by("-score")[: settings.RECOMMENDATION_LIMIT]
+    )
+    return [row.related for row in rows]
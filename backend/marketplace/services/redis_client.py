@@ -0,0 +1,39 @@
+import logging
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=1)
+def get_redis():
+    """Process-wide Redis client; redis-py pools connections internally."""
+    import redis
+
+    return redis.Redis.from_url(settings.REDIS_URL or "redis://localhost:6379/0")
+
+
+def get_async_redis():
+    # Async clients are bound to the running event loop, so don't share them.
+    import redis.asyncio
+
+    return redis.asyncio.Redis.from_url(settings.REDIS_URL or "redis://localhost:6379/0")
+
+
+def after_commit(func):
+    """
+    Run a best-effort Redis side effect once the transaction commits. Failures
+    are logged, not raised: the database change is already committed, so a
+    Redis outage must not turn the response into a 500 (or make a payment
+    provider retry a webhook that was applied).
+    """
+
+    def run():
+        try:
+            func()
+        except Exception:
+            logger.exception("After-commit hook %s failed", getattr(func, "__qualname__", func))
+
+    transaction.on_commit(run)
@@ -0,0 +1,165 @@
+from collections import defaultdict
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.contrib.gis.geos import Point
+from django.core.cache import cache
+from django.db import connection
+
+from marketplace.models import ShippingZone
+
+CENTS = Decimal("0.01")
+NO_ZONE = {"id": None}
+GENERATION_KEY = "shipping:generation"
+
+
+class ShippingUnavailable(Exception):
+    pass
+
+
+def destination_point(address):
+    """Return a WGS84 point from an order's ``delivery_address`` JSON, if it has one."""
+    if not isinstance(address, dict):
+        return None
+    try:
+        lat = float(address["lat"])
+        lng = float(address["lng"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    return Point(lng, lat, srid=4326)
+
+
+def _generation():
+    return cache.get_or_set(GENERATION_KEY, 1, timeout=None)
+
+
+def bump_generation():
+    """Invalidate every cached zone lookup and leg after a zone changes."""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 2, timeout=None)
+
+
+def _zone_key(point):
+    # ~100m grid cell; zone boundaries are far coarser than that.
+    return f"shipping:g{_generation()}:zone:{point.y:.3f}:{point.x:.3f}"
+
+
+def _leg_key(seller_id, zone_id, generation=None):
+    return f"shipping:g{generation or _generation()}:leg:{seller_id}:{zone_id}"
+
+
+def resolve_zone(point):
+    key = _zone_key(point)
+    zone = cache.get(key)
+    if zone is None:
+        match = (
+            ShippingZone.objects.filter(is_active=True, area__covers=point)
+            .order_by("base_fee")
+            .values("id", "name", "base_fee", "per_km_fee", "per_kg_fee")
+            .first()
+        )
+        zone = match or NO_ZONE
+        cache.set(key, zone, timeout=settings.SHIPPING_QUOTE_TTL)
+    return zone if zone["id"] is not None else None
+
+
+def seller_legs(seller_ids, zone_id):
+    """
+    Distance in km from each seller's pickup point to the zone centroid.
+
+    Tariffs are zonal: every address inside a zone is priced from the same
+    reference point, so the distance only depends on the (seller, zone) pair
+    and can be cached. Missing pairs are computed in one PostGIS query.
+    """
+    seller_ids = [str(s) for s in seller_ids]
+    generation = _generation()
+    keys = {_leg_key(s, zone_id, generation): s for s in seller_ids}
+    found = cache.get_many(list(keys))
+    legs = {keys[k]: v for k, v in found.items()}
+    missing = [s for s in seller_ids if s not in legs]
+    if missing:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT s.id::text,
+                       ST_Distance(s.pickup_location, ST_Centroid(z.area)::geography) / 1000.0
+                FROM marketplace_seller s
+                JOIN marketplace_shippingzone z ON z.id = %s
+                WHERE s.id = ANY(%s::uuid[])
+                """,
+                [zone_id, missing],
+            )
+            computed = {seller_id: km for seller_id, km in cursor.fetchall()}
+        fresh = {}
+        for seller_id in missing:
+            km = computed.get(seller_id)
+            legs[seller_id] = km
+            fresh[_leg_key(seller_id, zone_id, generation)] = km
+        cache.set_many(fresh, timeout=settings.SHIPPING_QUOTE_TTL)
+    return legs
+
+
+def forget_seller_legs(seller_id):
+    generation = _generation()
+    zone_ids = ShippingZone.objects.values_list("id", flat=True)
+    cache.delete_many([_leg_key(seller_id, z, generation) for z in zone_ids])
+
+
+def price(zone, distance_km, weight_kg):
+    fee = (
+        zone["base_fee"]
+        + zone["per_km_fee"] * Decimal(str(distance_km))
+        + zone["per_kg_fee"] * Decimal(weight_kg)
+    )
+    return fee.quantize(CENTS, rounding=ROUND_HALF_UP)
+
+
+def quote(address, weights):
+    """
+    Price delivery of ``weights`` ({seller_id: total kg}) to ``address``.
+
+    Returns the zone and one quote per seller; raises ShippingUnavailable when
+    the address has no coordinates or lies outside every active zone.
+    """
+    point = destination_point(address)
+    if point is None:
+        raise ShippingUnavailable("Delivery address needs lat and lng.")
+    zone = resolve_zone(point)
+    if zone is None:
+        raise ShippingUnavailable("We do not deliver to this address yet.")
+    legs = seller_legs(weights.keys(), zone["id"])
+    quotes = []
+    for seller_id, weight in weights.items():
+        km = legs.get(str(seller_id))
+        if km is None:
+            raise ShippingUnavailable(f"Seller {seller_id} has no pickup location.")
+        quotes.append(
+            {
+                "seller": str(seller_id),
+                "distance_km": round(km, 2),
+                "weight_kg": str(weight),
+                "shipping_fee": price(zone, km, weight),
+            }
+        )
+    return {"zone": zone["name"], "quotes": quotes}
+
+
+def cart_weights(lines):
+    """Group ``(product, quantity)`` lines into total kg per seller."""
+    weights = defaultdict(Decimal)
+    for product, quantity in lines:
+        weights[str(product.seller_id)] += product.weight_kg * quantity
+    return dict(weights)
+
+
+def order_shipping_fee(order, items):
+    if order.delivery_method == "pickup":
+        return Decimal("0.00")
+    weight = sum((i.product.weight_kg * i.quantity for i in items if i.product), Decimal(0))
+    try:
+        result = quote(order.delivery_address, {str(order.seller_id): weight})
+    except ShippingUnavailable:
+        return None
+    return result["quotes"][0]["shipping_fee"]
@@ -0,0 +1,332 @@
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.text import slugify
+
+from marketplace.models import Product, Seller
+from .redis_client import get_redis
+
+MANIFEST = "manifest.json"
+DIRTY_KEY = "catalogue:snapshots:dirty"
+SCHEDULED_KEY = "catalogue:snapshots:scheduled"
+LOCK_KEY = "catalogue:snapshots:publish"
+# Rewritten by order mining with UPDATE, never by a save, so it can't be kept current here.
+PRIVATE_FIELDS = ("popularity",)
+
+
+class PublishBusy(Exception):
+    pass
+
+
+def snapshot_storage():
+    return storages["snapshots"]
+
+
+def product_shards(product):
+    """Shards a product appears in now and, if it moved, where it was when loaded."""
+    category, seller_id = getattr(product, "_snapshot_origin", (None, None))
+    shards = {
+        f"product:{product.pk}",
+        f"category:{product.category}",
+        f"seller:{product.seller_id}",
+        f"month:{_month(product.created_at)}",
+    }
+    if category is not None:
+        shards.add(f"category:{category}")
+    if seller_id is not None:
+        shards.add(f"seller:{seller_id}")
+    return shards
+
+
+def _month(created_at):
+    return created_at.astimezone(dt_timezone.utc).strftime("%Y-%m")
+
+
+def mark_dirty(shards):
+    """
+    Queue shards for the next publish. The first change schedules a publish
+    SNAPSHOT_PUBLISH_DELAY seconds out and later changes ride along with it.
+    """
+    from marketplace.tasks import publish_catalogue_snapshots
+
+    redis = get_redis()
+    redis.sadd(DIRTY_KEY, *shards)
+    if redis.set(SCHEDULED_KEY, 1, nx=True, ex=settings.SNAPSHOT_PUBLISH_DELAY * 4):
+        publish_catalogue_snapshots.apply_async(countdown=settings.SNAPSHOT_PUBLISH_DELAY)
+
+
+def _encode(document):
+    return json.dumps(document, cls=DjangoJSONEncoder, sort_keys=True, separators=(",", ":")).encode()
+
+
+def _versioned(prefix, body):
+    return f"{prefix}.{hashlib.sha256(body).hexdigest()[:16]}.json"
+
+
+def _bucket(product_id):
+    return str(product_id).replace("-", "")[:2]
+
+
+def _product_document(product):
+    from marketplace.serializers import ProductSerializer
+
+    document = ProductSerializer(product).data
+    for field in PRIVATE_FIELDS:
+        document.pop(field, None)
+    return document
+
+
+class Publisher:
+    """
+    Writes content-addressed files (immutable, so they can be cached forever)
+    through a small thread pool, and remembers which keys the new manifest no
+    longer needs.
+    """
+
+    def __init__(self, storage):
+        self.storage = storage
+        self.pending = {}
+        self.written = 0
+        self.retired = set()
+        self.live = set()
+        self._pool = ThreadPoolExecutor(max_workers=settings.SNAPSHOT_UPLOAD_WORKERS)
+
+    def put(self, prefix, document, previous=None):
+        body = _encode(document)
+        key = _versioned(prefix, body)
+        self.live.add(key)
+        if key != previous:
+            self.pending[key] = body
+            if previous:
+                self.retired.add(previous)
+            if len(self.pending) >= settings.SNAPSHOT_UPLOAD_BATCH:
+                self.flush()
+        return key
+
+    def put_pages(self, prefix, header, documents, previous=()):
+        size = settings.SNAPSHOT_PAGE_SIZE
+        total = max(1, -(-len(documents) // size))
+        keys = [
+            self.put(
+                f"{prefix}/{number}",
+                {**header, "page": number, "pages": total, "products": documents[(number - 1) * size:number * size]},
+            )
+            for number in range(1, total + 1)
+        ]
+        self.retired.update(set(previous) - set(keys))
+        return keys
+
+    def flush(self):
+        items, self.pending = list(self.pending.items()), {}
+        list(self._pool.map(lambda item: self.storage.save(item[0], ContentFile(item[1])), items))
+        self.written += len(items)
+
+    def close(self):
+        self.flush()
+        self._pool.shutdown()
+
+
+def load_manifest(storage):
+    if not storage.exists(MANIFEST):
+        return None
+    with storage.open(MANIFEST, "rb") as fh:
+        return json.loads(fh.read())
+
+
+def _read(storage, key):
+    with storage.open(key, "rb") as fh:
+        return json.loads(fh.read())
+
+
+def _publish_categories(publisher, manifest, names):
+    for name in names:
+        previous = manifest["categories"].pop(name, {}).get("pages", [])
+        products = Product.objects.filter(category=name).order_by("name", "id")
+        documents = [_product_document(p) for p in products]
+        if not documents:
+            publisher.retired.update(previous)
+            continue
+        slug = slugify(name) or "category"
+        manifest["categories"][name] = {
+            "count": len(documents),
+            "pages": publisher.put_pages(f"categories/{slug}", {"category": name}, documents, previous),
+        }
+
+
+def _publish_months(publisher, manifest, months):
+    """
+    The whole catalogue newest first, as /api/products/ lists it, so the
+    products page can fetch just the page it shows. Pages are cut per creation
+    month (created_at never changes), so a change only rewrites its month's
+    pages; "all" lists every month's pages in order.
+    """
+    catalogue = manifest.setdefault("all", {})
+    if "months" not in catalogue:
+        # Manifest from before months: rebuild them all, retire the flat pages.
+        publisher.retired.update(catalogue.get("pages", []))
+        catalogue["months"] = {}
+        months = set(months) | {
+            _month(at) for at in Product.objects.datetimes("created_at", "month", tzinfo=dt_timezone.utc)
+        }
+    for month in months:
+        previous = catalogue["months"].pop(month, {}).get("pages", [])
+        year, number = map(int, month.split("-"))
+        start = datetime(year, number, 1, tzinfo=dt_timezone.utc)
+        end = datetime(year + number // 12, number % 12 + 1, 1, tzinfo=dt_timezone.utc)
+        products = Product.objects.filter(created_at__gte=start, created_at__lt=end).order_by("-created_at", "id")
+        documents = [_product_document(p) for p in products]
+        if not documents:
+            publisher.retired.update(previous)
+            continue
+        catalogue["months"][month] = {
+            "count": len(documents),
+            "pages": publisher.put_pages(f"catalogue/{month}", {"month": month}, documents, previous),
+        }
+    ordered = sorted(catalogue["months"].items(), reverse=True)
+    catalogue["count"] = sum(entry["count"] for _, entry in ordered)
+    catalogue["pages"] = [key for _, entry in ordered for key in entry["pages"]]
+
+
+def _publish_sellers(publisher, manifest, seller_ids):
+    sellers = {str(pk): seller for pk, seller in Seller.objects.in_bulk(seller_ids).items()}
+    for seller_id in seller_ids:
+        previous = manifest["sellers"].pop(seller_id, {}).get("pages", [])
+        seller = sellers.get(seller_id)
+        if seller is None:
+            publisher.retired.update(previous)
+            continue
+        documents = [_product_document(p) for p in seller.product_set.order_by("name", "id")]
+        header = {"seller": {"id": str(seller.pk), "business_name": seller.business_name}}
+        manifest["sellers"][str(seller.pk)] = {
+            "business_name": seller.business_name,
+            "count": len(documents),
+            "pages": publisher.put_pages(f"sellers/{seller.pk}", header, documents, previous),
+        }
+
+
+def _publish_products(publisher, manifest, product_ids, full):
+    storage = publisher.storage
+    buckets = manifest["products"]
+    touched = {_bucket(pk) for pk in product_ids} if not full else set(buckets)
+    old = {bucket: _read(storage, buckets[bucket]) for bucket in touched if bucket in buckets}
+    new = {} if full else {bucket: dict(entries) for bucket, entries in old.items()}
+
+    products = Product.objects.all() if full else Product.objects.filter(pk__in=product_ids)
+    seen = set()
+    for product in products.iterator(chunk_size=2000):
+        pk, bucket = str(product.pk), _bucket(product.pk)
+        previous = old.get(bucket, {}).get(pk)
+        new.setdefault(bucket, {})[pk] = publisher.put(f"products/{pk}", _product_document(product), previous)
+        seen.add(pk)
+    if not full:
+        for pk in map(str, product_ids):
+            if pk not in seen:
+                new.get(_bucket(pk), {}).pop(pk, None)
+    for bucket, entries in old.items():
+        publisher.retired.update(set(entries.values()) - set(new.get(bucket, {}).values()))
+
+    for bucket in touched | set(new):
+        entries = new.get(bucket)
+        if entries:
+            buckets[bucket] = publisher.put(f"products/index/{bucket}", entries, buckets.get(bucket))
+        elif bucket in buckets:
+            publisher.retired.add(buckets.pop(bucket))
+
+
+def _collect_garbage(storage, manifest, retired, live):
+    """
+    Delete files retired more than SNAPSHOT_RETENTION ago; clients holding an
+    older manifest may still fetch the rest. Keys that came back into use
+    (e.g. a reverted edit) are forgotten instead.
+    """
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=settings.SNAPSHOT_RETENTION)
+    kept = []
+    for key, at in manifest.get("retired", []):
+        if key in live:
+            continue
+        if parse_datetime(at) < cutoff:
+            storage.delete(key)
+        else:
+            kept.append([key, at])
+    kept.extend([key, now.isoformat()] for key in sorted(retired))
+    manifest["retired"] = kept
+
+
+def publish(shards=None):
+    """
+    Rewrite the catalogue snapshot files for ``shards`` ("category:<name>",
+    "seller:<id>", "product:<id>", "month:<YYYY-MM>"), or for everything when
+    ``shards`` is None or there is no manifest yet, then write a new manifest. Files are keyed by
+    content hash, so unchanged shards are not rewritten and the manifest is
+    the only object that changes in place.
+    """
+    storage = snapshot_storage()
+    lock = get_redis().lock(LOCK_KEY, timeout=settings.SNAPSHOT_LOCK_TIMEOUT)
+    if not lock.acquire(blocking=False):
+        raise PublishBusy()
+    try:
+        manifest = load_manifest(storage)
+        full = shards is None or manifest is None
+        manifest = manifest or {"version": 0, "categories": {}, "sellers": {}, "products": {}, "retired": []}
+        if full:
+            categories = set(Product.objects.order_by().values_list("category", flat=True).distinct())
+            categories |= set(manifest["categories"])
+            sellers = set(map(str, Seller.objects.values_list("id", flat=True)))
+            sellers |= set(manifest["sellers"])
+            months = {_month(at) for at in Product.objects.datetimes("created_at", "month", tzinfo=dt_timezone.utc)}
+            months |= set(manifest.get("all", {}).get("months", {}))
+            product_ids = ()
+        else:
+            kinds = {"category": set(), "seller": set(), "product": set(), "month": set()}
+            for shard in shards:
+                kind, _, value = shard.partition(":")
+                if kind in kinds:
+                    kinds[kind].add(value)
+            categories, sellers, product_ids = kinds["category"], kinds["seller"], kinds["product"]
+            months = kinds["month"]
+
+        publisher = Publisher(storage)
+        try:
+            _publish_categories(publisher, manifest, sorted(categories))
+            _publish_months(publisher, manifest, sorted(months))
+            _publish_sellers(publisher, manifest, sorted(sellers))
+            if full or product_ids:
+                _publish_products(publisher, manifest, product_ids, full)
+        finally:
+            publisher.close()
+
+        _collect_garbage(storage, manifest, publisher.retired - publisher.live, publisher.live)
+        manifest["version"] += 1
+        manifest["generated_at"] = timezone.now().isoformat()
+        storage.save(MANIFEST, ContentFile(_encode(manifest)))
+    finally:
+        lock.release()
+    return {"version": manifest["version"], "written": publisher.written, "full": full}
+
+
+def publish_dirty():
+    """Publish whatever shards changed since the last run (the debounced task)."""
+    redis = get_redis()
+    redis.delete(SCHEDULED_KEY)
+    pipe = redis.pipeline()
+    pipe.smembers(DIRTY_KEY)
+    pipe.delete(DIRTY_KEY)
+    members, _ = pipe.execute()
+    if not members:
+        return None
+    shards = {member.decode() for member in members}
+    try:
+        return publish(shards)
+    except Exception:
+        # Put them back so the next run retries them.
+        redis.sadd(DIRTY_KEY, *shards)
+        raise
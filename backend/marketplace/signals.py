@@ -0,0 +1,72 @@
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .models import Product, Seller, ShippingZone
+from .services.cart import drop_snapshot, store_snapshot
+from .services import snapshots
+from .services.catalogue import bump_catalogue_version
+from .services.redis_client import after_commit
+from .services.shipping import bump_generation, forget_seller_legs
+
+FACET_WARM_LOCK = "catalogue:facets:warm-scheduled"
+FACET_WARM_DELAY = 30
+
+
+def _invalidate_catalogue():
+    from .tasks import warm_product_facets
+
+    bump_catalogue_version()
+
+    # Debounce: a burst of product writes schedules a single warm-up.
+    if cache.add(FACET_WARM_LOCK, 1, timeout=FACET_WARM_DELAY):
+        warm_product_facets.apply_async(countdown=FACET_WARM_DELAY)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def product_changed(sender, instance, **kwargs):
+    # Bump after commit so readers never cache pre-commit rows under the new version.
+    after_commit(_invalidate_catalogue)
+
+
+@receiver(post_save, sender=Product)
+def refresh_product_snapshot(sender, instance, **kwargs):
+    after_commit(lambda: store_snapshot(instance))
+
+
+@receiver(post_delete, sender=Product)
+def remove_product_snapshot(sender, instance, **kwargs):
+    after_commit(lambda: drop_snapshot(instance.pk))
+
+
+@receiver(post_init, sender=Product)
+def remember_snapshot_origin(sender, instance, **kwargs):
+    # Where the product was listed when loaded, so moving it republishes both shards.
+    # Read from __dict__ so deferred fields aren't fetched.
+    instance._snapshot_origin = (instance.__dict__.get("category"), instance.__dict__.get("seller_id"))
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def product_snapshot_changed(sender, instance, **kwargs):
+    shards = snapshots.product_shards(instance)
+    instance._snapshot_origin = (instance.category, instance.seller_id)
+    after_commit(lambda: snapshots.mark_dirty(shards))
+
+
+@receiver(post_save, sender=Seller)
+def seller_snapshot_changed(sender, instance, **kwargs):
+    shard = f"seller:{instance.pk}"
+    after_commit(lambda: snapshots.mark_dirty([shard]))
+
+
+@receiver(post_save, sender=Seller)
+def seller_changed(sender, instance, **kwargs):
+    after_commit(lambda: forget_seller_legs(instance.pk))
+
+
+@receiver(post_save, sender=ShippingZone)
+@receiver(post_delete, sender=ShippingZone)
+def shipping_zone_changed(sender, instance, **kwargs):
+    after_commit(bump_generation)
@@ -0,0 +1,148 @@
+import asyncio
+import json
+import re
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from .models import Payment, SellerUser
+from .services.events import seller_stream, user_stream
+from .services.payments import resolution, status_channel
+from .services.redis_client import get_async_redis
+
+STREAM_ID = re.compile(r"^\d+-\d+$")
+
+
+def _raw_token(request):
+    # EventSource can't set headers, so accept ?token= as well.
+    token = request.GET.get("token")
+    if token:
+        return token.encode()
+    auth = JWTAuthentication()
+    header = auth.get_header(request)
+    return auth.get_raw_token(header) if header else None
+
+
+def _authenticate(raw_token):
+    auth = JWTAuthentication()
+    user = auth.get_user(auth.get_validated_token(raw_token))
+    seller_ids = list(
+        SellerUser.objects.filter(user=user).values_list("seller_id", flat=True)
+    )
+    return user, seller_ids
+
+
+def _format(entry_id, fields):
+    entry_id = entry_id.decode()
+    event = fields[b"event"].decode()
+    data = fields[b"data"].decode()
+    return f"id: {entry_id}\nevent: {event}\ndata: {data}\n\n"
+
+
+async def _event_stream(streams, last_id):
+    client = get_async_redis()
+    try:
+        if last_id == "$":
+            # Pin "now" once; re-sending "$" each loop would skip events that
+            # land on idle streams between reads.
+            seconds, micros = await client.time()
+            last_id = f"{seconds * 1000 + micros // 1000 - 1}-0"
+        cursors = {stream: last_id for stream in streams}
+        yield f"retry: {settings.EVENT_STREAM_RETRY_MS}\n\n"
+        while True:
+            batch = await client.xread(
+                cursors, block=settings.EVENT_STREAM_HEARTBEAT_MS, count=100
+            )
+            if not batch:
+                yield ": keep-alive\n\n"
+                continue
+            for stream, entries in batch:
+                for entry_id, fields in entries:
+                    cursors[stream.decode()] = entry_id.decode()
+                    yield _format(entry_id, fields)
+    finally:
+        await client.aclose()
+
+
+async def order_events(request):
+    """
+    Server-Sent Events feed of order and payment status changes for the
+    authenticated user and every seller they belong to. Reconnecting clients
+    send Last-Event-ID and receive whatever they missed from the stream backlog.
+    """
+    try:
+        raw_token = _raw_token(request)
+        if raw_token is None:
+            return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+        user, seller_ids = await sync_to_async(_authenticate)(raw_token)
+    except (AuthenticationFailed, InvalidToken) as exc:
+        return JsonResponse({"detail": str(exc.detail)}, status=401)
+
+    streams = [user_stream(user.pk)] + [seller_stream(s) for s in seller_ids]
+    last_id = request.headers.get("Last-Event-ID") or request.GET.get("last_event_id") or ""
+    if not STREAM_ID.match(last_id):
+        last_id = "$"
+    response = StreamingHttpResponse(
+        _event_stream(streams, last_id), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+def _visible_payment(payment_id, user, seller_ids):
+    payment = Payment.objects.select_related("order").filter(pk=payment_id).first()
+    if payment is None:
+        return None
+    order = payment.order
+    if user.role != "ops_admin" and order.buyer_id != user.pk and order.seller_id not in seller_ids:
+        return None
+    return payment
+
+
+async def payment_wait(request, payment_id):
+    """
+    Long-poll for a payment's outcome. Returns as soon as the initiation task
+    or the provider webhook resolves it, or {"status": "pending"} after
+    ?timeout= seconds. Waiting happens on Redis pub/sub, not the database.
+    """
+    try:
+        raw_token = _raw_token(request)
+        if raw_token is None:
+            return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+        user, seller_ids = await sync_to_async(_authenticate)(raw_token)
+    except (AuthenticationFailed, InvalidToken) as exc:
+        return JsonResponse({"detail": str(exc.detail)}, status=401)
+    payment = await sync_to_async(_visible_payment)(payment_id, user, seller_ids)
+    if payment is None:
+        return JsonResponse({"detail": "Not found."}, status=404)
+    if payment.status != "pending":
+        return JsonResponse(resolution(payment))
+
+    try:
+        timeout = float(request.GET.get("timeout", settings.PAYMENT_WAIT_DEFAULT_TIMEOUT))
+    except ValueError:
+        timeout = settings.PAYMENT_WAIT_DEFAULT_TIMEOUT
+    timeout = min(max(timeout, 0), settings.PAYMENT_WAIT_MAX_TIMEOUT)
+    channel = status_channel(payment.pk)
+    client = get_async_redis()
+    pubsub = client.pubsub(ignore_subscribe_messages=True)
+    try:
+        await pubsub.subscribe(channel)
+        # Subscribed first, so a resolution published before this read is in the key.
+        stored = await client.get(channel)
+        if stored is not None:
+            return JsonResponse(json.loads(stored))
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while (remaining := deadline - loop.time()) > 0:
+            message = await pubsub.get_message(timeout=remaining)
+            if message is not None:
+                return JsonResponse(json.loads(message["data"]))
+    finally:
+        await pubsub.aclose()
+        await client.aclose()
+    return JsonResponse(resolution(payment))
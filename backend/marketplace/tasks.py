@@ -1,4 +1,9 @@
 from celery import shared_task
+from django.conf import settings
+
+# Web processes load the Celery app lazily; importing tasks is what needs it,
+# so .delay() publishes through the project app rather than Celery's default.
+from core import celery_app  # noqa: F401
 from django.utils import timezone
 from .models import Payment
 
@@ -7,3 +12,65 @@ def reconcile_payments():
     # TODO: call PSP/operators to confirm settlement vs internal records
     pending = Payment.objects.filter(status="pending", created_at__lt=timezone.now())
     return pending.count()
+
+@shared_task
+def warm_product_facets():
+    from .services.catalogue import warm_facets
+    return warm_facets()
+
+@shared_task
+def dispatch_outbox():
+    from .services.outbox import dispatch
+    sent = total = dispatch()
+    # Keep draining while batches come back full, bounded so one run can't hog a worker.
+    for _ in range(20):
+        if sent < settings.OUTBOX_BATCH_SIZE:
+            break
+        sent = dispatch()
+        total += sent
+    return total
+
+@shared_task
+def ensure_payment_partitions():
+    from .services.partitions import ensure_partitions
+    return ensure_partitions()
+
+@shared_task
+def archive_closed_payment_months():
+    from .services import archive
+    return [str(archive.archive_month(m).month) for m in archive.closed_months()]
+
+@shared_task
+def mine_recommendations():
+    from .services.recommendations import mine_new_orders
+    return mine_new_orders()
+
+@shared_task(bind=True, max_retries=None, acks_late=True)
+def initiate_payment(self, payment_id, failures=0):
+    import random
+
+    import requests
+    from .services import payments
+
+    try:
+        return str(payments.initiate(payment_id).status)
+    except payments.ProviderBusy:
+        # Not an error; initiate() fails the payment once PAYMENT_INITIATION_TIMEOUT passes.
+        delay = settings.PAYMENT_INITIATION_BUSY_DELAY
+        raise self.retry(countdown=delay + random.uniform(0, delay))
+    except requests.RequestException as exc:
+        # Counted apart from busy retries, which say nothing about the provider's health.
+        if failures >= settings.PAYMENT_INITIATION_MAX_RETRIES:
+            payments.fail(Payment.objects.get(pk=payment_id), f"Provider unreachable: {exc}")
+            return "failed"
+        raise self.retry(exc=exc, countdown=2 ** failures, args=(payment_id,), kwargs={"failures": failures + 1})
+
+@shared_task(bind=True, max_retries=None)
+def publish_catalogue_snapshots(self):
+    from .services import snapshots
+
+    try:
+        return snapshots.publish_dirty()
+    except snapshots.PublishBusy:
+        # Another publish (e.g. publish_catalogue --all) holds the lock; the shards are queued again.
+        raise self.retry(countdown=settings.SNAPSHOT_PUBLISH_DELAY)
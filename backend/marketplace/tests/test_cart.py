@@ -0,0 +1,122 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase
+
+from marketplace.models import Order, Product, Seller, User
+from marketplace.services import cart
+from marketplace.services.redis_client import get_redis
+
+
+class CartCheckoutTests(TestCase):
+    """Runs against the Redis at REDIS_URL; only this test user's keys are touched."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.buyer = User.objects.create_user("255711000001", password="x", full_name="Buyer")
+        owner = User.objects.create_user("255711000002", password="x", full_name="Owner")
+        cls.cement_co = Seller.objects.create(user=owner, business_name="Cement Co", phone="255711000003")
+        cls.steel_co = Seller.objects.create(user=owner, business_name="Steel Co", phone="255711000004")
+        cls.cement = Product.objects.create(
+            seller=cls.cement_co, category="Cement", name="Cement 42.5N", unit="bag", price=Decimal("18000")
+        )
+        cls.sand = Product.objects.create(
+            seller=cls.cement_co, category="Aggregates", name="River sand", unit="ton", price=Decimal("45000")
+        )
+        cls.rebar = Product.objects.create(
+            seller=cls.steel_co, category="Steel", name="Rebar Y12", unit="bar", price=Decimal("23500")
+        )
+
+    def setUp(self):
+        self.forget()
+        self.addCleanup(self.forget)
+
+    def forget(self):
+        keys = [cart._cart_key(self.buyer.pk), cart._checkout_key(self.buyer.pk)]
+        keys += [cart._snapshot_key(p.pk) for p in (self.cement, self.sand, self.rebar)]
+        get_redis().delete(*keys)
+
+    def quantities(self):
+        return {line["product_id"]: line["quantity"] for line in cart.get_cart(self.buyer.pk)["items"]}
+
+    def checkout(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return cart.checkout(self.buyer)
+
+    def test_checkout_splits_orders_per_seller(self):
+        cart.set_item(self.buyer.pk, self.cement.pk, 10)
+        cart.set_item(self.buyer.pk, self.sand.pk, 2)
+        cart.set_item(self.buyer.pk, self.rebar.pk, 4)
+
+        orders = self.checkout()
+
+        totals = {str(o.seller_id): o.total for o in Order.objects.filter(pk__in=[o.pk for o in orders])}
+        self.assertEqual(
+            totals,
+            {str(self.cement_co.pk): Decimal("270000.00"), str(self.steel_co.pk): Decimal("94000.00")},
+        )
+        rebar_order = Order.objects.get(seller=self.steel_co)
+        self.assertEqual(rebar_order.items.get().line_total, Decimal("94000.00"))
+        self.assertEqual(cart.get_cart(self.buyer.pk)["items"], [])
+        self.assertFalse(get_redis().exists(cart._checkout_key(self.buyer.pk)))
+
+    def test_checkout_charges_the_current_price(self):
+        cart.set_item(self.buyer.pk, self.cement.pk, 10)
+        Product.objects.filter(pk=self.cement.pk).update(price=Decimal("19000"))
+
+        (order,) = self.checkout()
+
+        self.assertEqual(order.total, Decimal("190000"))
+        self.assertEqual(order.items.get().unit_price, Decimal("19000"))
+
+    def test_second_checkout_finds_the_cart_empty(self):
+        cart.set_item(self.buyer.pk, self.cement.pk, 1)
+        self.checkout()
+
+        with self.assertRaisesMessage(cart.CartError, "Cart is empty."):
+            cart.checkout(self.buyer)
+        self.assertEqual(Order.objects.filter(buyer=self.buyer).count(), 1)
+
+    def test_checkout_in_progress_blocks_another(self):
+        cart.set_item(self.buyer.pk, self.cement.pk, 1)
+        cart._take(self.buyer.pk)
+        cart.set_item(self.buyer.pk, self.sand.pk, 1)
+
+        with self.assertRaisesMessage(cart.CartError, "already in progress"):
+            cart.checkout(self.buyer)
+
+    def test_failed_checkout_gives_the_lines_back(self):
+        cart.set_item(self.buyer.pk, self.cement.pk, 10)
+        cart.set_item(self.buyer.pk, self.sand.pk, 2)
+
+        def add_meanwhile_then_fail(*args):
+            # Another tab edits the cart while this checkout holds it.
+            cart.set_item(self.buyer.pk, self.rebar.pk, 3)
+            cart.set_item(self.buyer.pk, self.sand.pk, 5)
+            raise cart.CartError("Shipping is unavailable.")
+
+        with mock.patch.object(cart, "_place_orders", side_effect=add_meanwhile_then_fail):
+            with self.assertRaises(cart.CartError):
+                cart.checkout(self.buyer)
+
+        self.assertEqual(
+            self.quantities(),
+            {str(self.cement.pk): 10, str(self.sand.pk): 5, str(self.rebar.pk): 3},
+        )
+        self.assertFalse(get_redis().exists(cart._checkout_key(self.buyer.pk)))
+
+    def test_missing_product_fails_checkout_and_keeps_the_cart(self):
+        cart.set_item(self.buyer.pk, self.cement.pk, 10)
+        cart.set_item(self.buyer.pk, self.rebar.pk, 4)
+        rebar_id = str(self.rebar.pk)
+        Product.objects.filter(pk=self.rebar.pk).delete()
+
+        with self.assertRaisesMessage(cart.CartError, f"Products no longer available: {rebar_id}"):
+            cart.checkout(self.buyer)
+
+        self.assertFalse(Order.objects.filter(buyer=self.buyer).exists())
+        self.assertEqual(self.quantities(), {str(self.cement.pk): 10, rebar_id: 4})
+
+    def test_unknown_product_id_is_rejected(self):
+        with self.assertRaisesMessage(cart.CartError, "Product not found."):
+            cart.set_item(self.buyer.pk, "not-a-uuid", 1)
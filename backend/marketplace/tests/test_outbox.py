@@ -0,0 +1,126 @@
+from datetime import timedelta
+
+from django.core import mail
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from marketplace.models import OutboxEvent
+from marketplace.services import outbox
+from marketplace.services.notifications import LocMemSMSBackend
+
+BAD_NUMBER = "255700000000"
+
+
+class FailingSMSBackend(LocMemSMSBackend):
+    """Rejects any send that includes BAD_NUMBER, like a provider failing a whole request."""
+
+    def send_messages(self, messages):
+        if any(m["to"] == BAD_NUMBER for m in messages):
+            raise RuntimeError("provider rejected the request")
+        return super().send_messages(messages)
+
+
+def sms(recipient, key, order="00000000-0000-0000-0000-000000000001", status="confirmed"):
+    payload = {"order": order, "status": status, "audience": "buyer"}
+    return (outbox.ORDER_STATUS, OutboxEvent.CHANNEL_SMS, recipient, payload, key)
+
+
+@override_settings(
+    EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+    SMS_BACKEND="marketplace.services.notifications.LocMemSMSBackend",
+    OUTBOX_MAX_ATTEMPTS=3,
+)
+class OutboxDispatchTests(TestCase):
+    def setUp(self):
+        LocMemSMSBackend.outbox.clear()
+
+    def make_due(self):
+        # Failed events back off; pull them forward so the next dispatch sees them.
+        OutboxEvent.objects.update(available_at=timezone.now() - timedelta(seconds=1))
+
+    def test_record_ignores_a_repeated_dedupe_key(self):
+        outbox.record([sms("255711111111", "order:1:confirmed:buyer:sms")])
+        outbox.record([sms("255711111111", "order:1:confirmed:buyer:sms")])
+
+        self.assertEqual(OutboxEvent.objects.count(), 1)
+
+    def test_record_skips_events_without_a_recipient(self):
+        outbox.record([sms("", "order:1:confirmed:buyer:sms")])
+
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_events_for_one_recipient_are_coalesced_into_one_message(self):
+        outbox.record(
+            [
+                sms("255711111111", "a", status="confirmed"),
+                sms("255711111111", "b", status="dispatched"),
+                sms("255722222222", "c"),
+            ]
+        )
+        outbox.record(
+            [
+                (
+                    outbox.ORDER_STATUS,
+                    OutboxEvent.CHANNEL_EMAIL,
+                    "buyer@example.com",
+                    {"order": "00000000-0000-0000-0000-000000000001", "status": "confirmed"},
+                    "d",
+                )
+            ]
+        )
+
+        self.assertEqual(outbox.dispatch(), 4)
+
+        by_recipient = {m["to"]: m for m in LocMemSMSBackend.outbox}
+        self.assertEqual(set(by_recipient), {"255711111111", "255722222222"})
+        self.assertEqual(by_recipient["255711111111"]["body"].count("\n"), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["buyer@example.com"])
+        self.assertFalse(OutboxEvent.objects.filter(sent_at__isnull=True).exists())
+
+    def test_sent_events_are_not_sent_again(self):
+        outbox.record([sms("255711111111", "a")])
+        outbox.dispatch()
+        self.make_due()
+
+        self.assertEqual(outbox.dispatch(), 0)
+        self.assertEqual(len(LocMemSMSBackend.outbox), 1)
+
+    @override_settings(SMS_BACKEND="marketplace.tests.test_outbox.FailingSMSBackend")
+    def test_one_failing_recipient_does_not_hold_back_the_others(self):
+        outbox.record([sms("255711111111", "a"), sms(BAD_NUMBER, "b"), sms("255722222222", "c")])
+
+        self.assertEqual(outbox.dispatch(), 2)
+
+        self.assertEqual({m["to"] for m in LocMemSMSBackend.outbox}, {"255711111111", "255722222222"})
+        bad = OutboxEvent.objects.get(recipient=BAD_NUMBER)
+        self.assertIsNone(bad.sent_at)
+        self.assertEqual(bad.attempts, 1)
+        self.assertIn("provider rejected", bad.last_error)
+        self.assertGreater(bad.available_at, timezone.now())
+        self.assertIsNone(bad.failed_at)
+
+    @override_settings(SMS_BACKEND="marketplace.tests.test_outbox.FailingSMSBackend")
+    def test_event_is_parked_after_max_attempts(self):
+        outbox.record([sms(BAD_NUMBER, "b")])
+
+        for _ in range(3):
+            self.make_due()
+            outbox.dispatch()
+
+        event = OutboxEvent.objects.get()
+        self.assertEqual(event.attempts, 3)
+        self.assertIsNotNone(event.failed_at)
+        self.assertIsNone(event.sent_at)
+
+        self.make_due()
+        outbox.dispatch()
+        self.assertEqual(OutboxEvent.objects.get().attempts, 3)
+
+    def test_claimed_events_are_leased_away_from_other_dispatchers(self):
+        outbox.record([sms("255711111111", "a")])
+
+        claimed = outbox._claim(10, timezone.now())
+
+        self.assertEqual(len(claimed), 1)
+        self.assertEqual(outbox._claim(10, timezone.now()), [])
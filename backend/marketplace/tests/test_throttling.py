@@ -0,0 +1,99 @@
+import hashlib
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.test import SimpleTestCase, override_settings
+from redis.exceptions import ConnectionError as RedisConnectionError
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from marketplace.throttling import LoginThrottle, SearchThrottle, TokenBucketThrottle
+
+factory = APIRequestFactory()
+
+
+class UserThrottle(TokenBucketThrottle):
+    scope = "test_user"
+
+
+def make_request(wsgi_request, user=None):
+    request = Request(wsgi_request, parsers=[JSONParser()])
+    request.user = user or AnonymousUser()
+    return request
+
+
+def keys(throttle, request):
+    return [key for key, _ in throttle.buckets(request, view=None)]
+
+
+class BucketKeyTests(SimpleTestCase):
+    def test_login_buckets_by_ip_and_hashed_phone(self):
+        request = make_request(
+            factory.post("/api/auth/login/", {"phone": "255711000001"}, format="json", REMOTE_ADDR="203.0.113.9")
+        )
+
+        digest = hashlib.sha1(b"255711000001").hexdigest()
+        self.assertEqual(
+            sorted(keys(LoginThrottle(), request)),
+            ["throttle:login:ip:203.0.113.9", f"throttle:login:phone:{digest}"],
+        )
+
+    def test_login_without_phone_only_buckets_by_ip(self):
+        request = make_request(factory.post("/api/auth/login/", {}, format="json", REMOTE_ADDR="203.0.113.9"))
+
+        self.assertEqual(keys(LoginThrottle(), request), ["throttle:login:ip:203.0.113.9"])
+
+    @override_settings(RATE_LIMITS={"test_user": {"user": "5/min"}})
+    def test_user_bucket_only_for_signed_in_users(self):
+        user = SimpleNamespace(pk="b7c1", is_authenticated=True)
+
+        self.assertEqual(keys(UserThrottle(), make_request(factory.get("/"), user)), ["throttle:test_user:user:b7c1"])
+        self.assertEqual(keys(UserThrottle(), make_request(factory.get("/"))), [])
+
+
+class ClientIPTests(SimpleTestCase):
+    def ident(self):
+        request = make_request(
+            factory.get("/", REMOTE_ADDR="10.0.0.1", HTTP_X_FORWARDED_FOR="198.51.100.7, 203.0.113.9")
+        )
+        return TokenBucketThrottle().get_identity("ip", request, view=None)
+
+    def test_one_proxy_trusts_the_last_forwarded_address(self):
+        with override_settings(REST_FRAMEWORK={"NUM_PROXIES": 1}):
+            self.assertEqual(self.ident(), "203.0.113.9")
+
+    def test_two_proxies_take_the_address_before_them(self):
+        with override_settings(REST_FRAMEWORK={"NUM_PROXIES": 2}):
+            self.assertEqual(self.ident(), "198.51.100.7")
+
+    def test_no_proxies_ignores_forwarded_for(self):
+        with override_settings(REST_FRAMEWORK={"NUM_PROXIES": 0}):
+            self.assertEqual(self.ident(), "10.0.0.1")
+
+
+class AllowRequestTests(SimpleTestCase):
+    def search_request(self, query=""):
+        return make_request(factory.get(f"/api/products/{query}", REMOTE_ADDR="203.0.113.9"))
+
+    def test_search_throttle_skips_plain_listing(self):
+        with mock.patch.object(TokenBucketThrottle, "script") as script:
+            self.assertTrue(SearchThrottle().allow_request(self.search_request(), view=None))
+        script.assert_not_called()
+
+    def test_search_throttle_applies_to_searches(self):
+        throttle = SearchThrottle()
+        with mock.patch.object(TokenBucketThrottle, "script", return_value=mock.Mock(return_value=b"2.5")):
+            self.assertFalse(throttle.allow_request(self.search_request("?search=cement"), view=None))
+        self.assertEqual(throttle.wait(), 2.5)
+
+    def test_request_passes_when_every_bucket_has_a_token(self):
+        with mock.patch.object(TokenBucketThrottle, "script", return_value=mock.Mock(return_value=b"0")):
+            self.assertTrue(SearchThrottle().allow_request(self.search_request("?search=cement"), view=None))
+
+    def test_redis_errors_fail_open(self):
+        failing = mock.Mock(side_effect=RedisConnectionError("connection refused"))
+        with mock.patch.object(TokenBucketThrottle, "script", return_value=failing):
+            with self.assertLogs("marketplace.throttling", level="ERROR"):
+                self.assertTrue(SearchThrottle().allow_request(self.search_request("?search=cement"), view=None))
@@ -0,0 +1,132 @@
+import hashlib
+import logging
+
+from django.conf import settings
+from rest_framework.throttling import BaseThrottle
+
+from .services.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {"s": 1, "sec": 1, "m": 60, "min": 60, "h": 3600, "hour": 3600, "d": 86400, "day": 86400}
+
+# KEYS: one bucket per key. ARGV: refill rate (tokens/s) and capacity per key.
+# Every bucket must have a token for the request to pass; tokens are only
+# taken when all of them do, so one EVALSHA decides the whole request.
+TOKEN_BUCKET_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local states = {}
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[2 * i - 1])
+    local capacity = tonumber(ARGV[2 * i])
+    local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(bucket[1]) or capacity
+    local ts = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + (now - ts) * rate)
+    if tokens < 1 then
+        wait = math.max(wait, (1 - tokens) / rate)
+    end
+    states[i] = tokens
+end
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[2 * i - 1])
+    local capacity = tonumber(ARGV[2 * i])
+    local tokens = states[i]
+    if wait == 0 then
+        tokens = tokens - 1
+    end
+    redis.call('HSET', key, 'tokens', tokens, 'ts', now)
+    redis.call('EXPIRE', key, math.ceil(capacity / rate) + 1)
+end
+return tostring(wait)
+"""
+
+
+def parse_rate(rate):
+    """'10/min' -> (tokens per second, burst capacity)."""
+    num, period = rate.split("/")
+    count = int(num)
+    return count / PERIODS[period], count
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Redis token buckets configured in settings.RATE_LIMITS[scope], e.g.
+    {"ip": "10/min", "phone": "5/min", "endpoint": "1000/min"}. All buckets
+    for a request are checked in a single script call. Fails open if Redis is
+    unreachable, so an outage never locks buyers out.
+    """
+
+    scope = None
+    _script = None
+
+    def get_identity(self, kind, request, view):
+        if kind == "ip":
+            return self.get_ident(request)
+        if kind == "user":
+            return request.user.pk if request.user.is_authenticated else None
+        if kind == "phone":
+            phone = request.data.get("phone") if hasattr(request, "data") else None
+            return hashlib.sha1(str(phone).encode()).hexdigest() if phone else None
+        if kind == "endpoint":
+            return "all"
+        raise ValueError(f"Unknown rate limit key {kind!r}")
+
+    def buckets(self, request, view):
+        for kind, rate in settings.RATE_LIMITS.get(self.scope, {}).items():
+            identity = self.get_identity(kind, request, view)
+            if identity is not None:
+                yield f"throttle:{self.scope}:{kind}:{identity}", parse_rate(rate)
+
+    @classmethod
+    def script(cls):
+        if TokenBucketThrottle._script is None:
+            TokenBucketThrottle._script = get_redis().register_script(TOKEN_BUCKET_LUA)
+        return TokenBucketThrottle._script
+
+    def allow_request(self, request, view):
+        self.wait_seconds = None
+        buckets = list(self.buckets(request, view))
+        if not buckets:
+            return True
+        keys = [key for key, _ in buckets]
+        args = [value for _, (rate, capacity) in buckets for value in (rate, capacity)]
+        try:
+            wait = float(self.script()(keys=keys, args=args))
+        except Exception:
+            logger.exception("Rate limiter unavailable; allowing request")
+            return True
+        if wait > 0:
+            self.wait_seconds = wait
+            return False
+        return True
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class LoginThrottle(TokenBucketThrottle):
+    scope = "login"
+
+
+class RegisterThrottle(TokenBucketThrottle):
+    scope = "register"
+
+
+class WebhookThrottle(TokenBucketThrottle):
+    scope = "webhook"
+
+
+class SearchThrottle(TokenBucketThrottle):
+    scope = "search"
+
+    def allow_request(self, request, view):
+        if not request.query_params.get("search"):
+            return True
+        return super().allow_request(request, view)
+
+
+class AutocompleteThrottle(TokenBucketThrottle):
+    scope = "autocomplete"
@@ -1,14 +1,23 @@
+import uuid
+from collections import defaultdict
+
 from rest_framework import viewsets, permissions, status
 from rest_framework.exceptions import ValidationError
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.decorators import action, api_view, permission_classes, throttle_classes
+from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.response import Response
+from datetime import datetime, time, timezone as dt_timezone
 from django.db import transaction
+from django.db.models import Prefetch
+from django.urls import reverse
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from .models import (
     Seller,
     Product,
     Order,
     OrderItem,
+    DeliveryRun,
     Payment,
     User,
     SellerUser,
@@ -18,27 +27,70 @@ from .serializers import (
     SellerSerializer,
     ProductSerializer,
     OrderSerializer,
+    DeliveryRunSerializer,
     PaymentSerializer,
     UserSerializer,
     SellerInvitationSerializer,
 )
 from .permissions import IsSellerOrReadOnly
+from .throttling import AutocompleteThrottle, SearchThrottle, WebhookThrottle
+from .services.catalogue import cached_facets, response_cache_key
+from .services import (
+    autocomplete,
+    cart,
+    dispatch,
+    invitations,
+    outbox,
+    payments,
+    recommendations,
+    shipping,
+)
+from .services.events import publish_order_event, publish_payment_event
+from .services.orders import change_status, stamp_confirmed
 
 
 def _get_user_seller_memberships(user):
     return SellerUser.objects.filter(user=user).select_related("seller")
 
+
+def _user_seller_ids(user):
+    """Ids of the user's sellers, memoized on the user so a /api/batch/ call looks them up once."""
+    if not hasattr(user, "_seller_ids"):
+        user._seller_ids = list(
+            SellerUser.objects.filter(user=user).values_list("seller_id", flat=True)
+        )
+    return user._seller_ids
+
+
+def _forget_user_seller_ids(user):
+    user.__dict__.pop("_seller_ids", None)
+
+
+def _since(queryset, request):
+    """
+    Optional ?since=YYYY-MM-DD lower bound on created_at for list endpoints;
+    on payments it also lets Postgres skip older monthly partitions.
+    """
+    since = request.query_params.get("since")
+    if not since:
+        return queryset
+    parsed = parse_date(since)
+    if parsed is None:
+        raise ValidationError("since must be YYYY-MM-DD.")
+    return queryset.filter(created_at__gte=datetime.combine(parsed, time.min, tzinfo=dt_timezone.utc))
+
 class SellerViewSet(viewsets.ModelViewSet):
     queryset = Seller.objects.all()
     serializer_class = SellerSerializer
     permission_classes = [permissions.IsAuthenticated]
+    replica_reads = True
 
     def get_queryset(self):
         user = self.request.user
         if user.role in ("ops_admin",):
             return Seller.objects.all().select_related("user").prefetch_related("members__user")
         if user.role in ("seller_admin", "seller_staff"):
-            seller_ids = _get_user_seller_memberships(user).values_list("seller_id", flat=True)
+            seller_ids = _user_seller_ids(user)
             return (
                 Seller.objects.filter(id__in=seller_ids)
                 .select_related("user")
@@ -54,6 +106,18 @@ class SellerViewSet(viewsets.ModelViewSet):
             defaults={"role": SellerUser.ROLE_ADMIN},
         )
 
+    @action(detail=True, methods=["post"])
+    def plan_deliveries(self, request, pk=None):
+        """Plan delivery runs for ``date`` (default today) from confirmed delivery orders."""
+        seller = self.get_object()
+        raw = request.data.get("date") or request.query_params.get("date")
+        date = parse_date(raw) if raw else timezone.localdate()
+        if date is None:
+            raise ValidationError("date must be YYYY-MM-DD.")
+        runs = dispatch.plan(seller, date)
+        runs = _delivery_runs().filter(pk__in=[run.pk for run in runs])
+        return Response(DeliveryRunSerializer(runs, many=True).data, status=status.HTTP_201_CREATED)
+
 class ProductViewSet(viewsets.ModelViewSet):
     queryset = Product.objects.select_related("seller").order_by("-created_at")
     serializer_class = ProductSerializer
@@ -61,6 +125,8 @@ class ProductViewSet(viewsets.ModelViewSet):
     filterset_fields = ["category","seller"]
     search_fields = ["name","brand","category"]
     ordering_fields = ["price","created_at"]
+    throttle_classes = [SearchThrottle]
+    replica_reads = True
 
     def perform_create(self, serializer):
         membership = _get_user_seller_memberships(self.request.user).first()
@@ -68,10 +134,41 @@ class ProductViewSet(viewsets.ModelViewSet):
             raise ValidationError("Seller profile not found for user")
         serializer.save(seller=membership.seller)
 
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if request.method == "GET" and response.status_code == 200:
+            response.compression_cache_key = response_cache_key(request)
+        return response
+
+    @action(detail=False, methods=["get"])
+    def facets(self, request):
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(cached_facets(queryset, request.query_params))
+
+    @action(detail=False, methods=["get"], throttle_classes=[AutocompleteThrottle])
+    def autocomplete(self, request):
+        try:
+            limit = int(request.query_params.get("limit", 0)) or None
+        except ValueError:
+            raise ValidationError("limit must be an integer.")
+        return Response(autocomplete.suggest(request.query_params.get("q"), limit))
+
+    @action(detail=True, methods=["get"])
+    def related(self, request, pk=None):
+        def compute():
+            product = self.get_object()
+            related = recommendations.related_products(product.pk)
+            return ProductSerializer(related, many=True).data
+
+        return Response(recommendations.cached_related(pk, compute))
+
 class OrderViewSet(viewsets.ModelViewSet):
     queryset = Order.objects.all().order_by("-created_at")
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # Pages only when the client sends ?limit= (and ?offset=); the buyer and
+    # seller (..., -created_at) indexes serve each page.
+    pagination_class = LimitOffsetPagination
 
     def get_queryset(self):
         u = self.request.user
@@ -80,8 +177,10 @@ class OrderViewSet(viewsets.ModelViewSet):
             .prefetch_related("items", "items__product")
             .order_by("-created_at")
         )
+        if self.action == "list":
+            base = _since(base, self.request)
         if u.role in ("seller_admin","seller_staff"):
-            seller_ids = _get_user_seller_memberships(u).values_list("seller_id", flat=True)
+            seller_ids = _user_seller_ids(u)
             return base.filter(seller_id__in=seller_ids)
         return base.filter(buyer=u)
 
@@ -97,21 +196,153 @@ class OrderViewSet(viewsets.ModelViewSet):
         OrderItem.objects.create(order=order, product=product, quantity=qty,
                                  unit_price=product.price, line_total=line_total)
         # recompute totals
-        items = order.items.all()
+        items = order.items.select_related("product")
         subtotal = sum([i.line_total for i in items])
         order.subtotal = subtotal
         order.tax = 0
-        order.total = subtotal
+        order.shipping_fee = shipping.order_shipping_fee(order, items)
+        order.total = subtotal + order.tax + (order.shipping_fee or 0)
         order.save()
         return Response(OrderSerializer(order).data)
 
     def perform_create(self, serializer):
         serializer.save(buyer=self.request.user)
 
+    @transaction.atomic
+    def perform_update(self, serializer):
+        previous_status = serializer.instance.status
+        order = serializer.save()
+        if stamp_confirmed(order):
+            order.save(update_fields=["confirmed_at"])
+        if order.status != previous_status:
+            outbox.notify_order_status(order)
+            publish_order_event(order)
+
+class CartViewSet(viewsets.ViewSet):
+    """Server-side cart kept in Redis; only checkout writes to Postgres."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def list(self, request):
+        return Response(cart.get_cart(request.user.pk))
+
+    @action(detail=False, methods=["post"])
+    def items(self, request):
+        try:
+            product_id = request.data["product_id"]
+            quantity = int(request.data.get("quantity", 1))
+        except (KeyError, TypeError, ValueError):
+            raise ValidationError("product_id and an integer quantity are required.")
+        try:
+            cart.set_item(request.user.pk, product_id, quantity)
+        except cart.CartError as exc:
+            raise ValidationError(str(exc))
+        return Response(cart.get_cart(request.user.pk))
+
+    @action(detail=False, methods=["post"])
+    def clear(self, request):
+        cart.clear(request.user.pk)
+        return Response({"ok": True})
+
+    @action(detail=False, methods=["post"])
+    def checkout(self, request):
+        try:
+            orders = cart.checkout(
+                request.user,
+                delivery_method=request.data.get("delivery_method", "pickup"),
+                delivery_address=request.data.get("delivery_address"),
+            )
+        except cart.CartError as exc:
+            raise ValidationError(str(exc))
+        return Response(
+            OrderSerializer(
+                Order.objects.filter(id__in=[o.id for o in orders])
+                .prefetch_related("items"),
+                many=True,
+            ).data,
+            status=status.HTTP_201_CREATED,
+        )
+
+def _delivery_runs():
+    return DeliveryRun.objects.prefetch_related(
+        Prefetch("stops", queryset=Order.objects.order_by("run_sequence"))
+    ).order_by("date", "created_at")
+
+class DeliveryRunViewSet(viewsets.ReadOnlyModelViewSet):
+    serializer_class = DeliveryRunSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filterset_fields = ["date", "status", "seller"]
+
+    def get_queryset(self):
+        user = self.request.user
+        runs = _delivery_runs()
+        if user.role == "ops_admin":
+            return runs
+        seller_ids = _user_seller_ids(user)
+        return runs.filter(seller_id__in=seller_ids)
+
+    # Not named "dispatch": that would shadow APIView.dispatch.
+    @action(detail=True, methods=["post"], url_path="dispatch")
+    def dispatch_run(self, request, pk=None):
+        run = self.get_object()
+        try:
+            dispatch.dispatch(run)
+        except dispatch.DispatchError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(self.get_queryset().get(pk=run.pk)).data)
+
 class PaymentViewSet(viewsets.ModelViewSet):
     queryset = Payment.objects.select_related("order").order_by("-created_at")
     serializer_class = PaymentSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = LimitOffsetPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == "list":
+            queryset = _since(queryset, self.request)
+        return queryset
+
+    def create(self, request, *args, **kwargs):
+        """
+        Record a payment for the order's total and hand the operator call to a
+        Celery task; the response is 202 with a wait_url to long-poll for the
+        outcome. An order takes one pending or successful payment at a time.
+        """
+        from .tasks import initiate_payment
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        order = serializer.validated_data["order"]
+        provider = (serializer.validated_data.get("provider") or "").lower()
+        if order.buyer_id != request.user.pk:
+            raise ValidationError({"order": "You can only pay for your own orders."})
+        if provider not in payments.PaymentGateway.PROVIDERS:
+            raise ValidationError({"provider": f"Choose one of {', '.join(payments.PaymentGateway.PROVIDERS)}."})
+        phone = payments.normalize_msisdn(request.data.get("phone") or request.user.phone)
+        if phone is None:
+            raise ValidationError({"phone": "Enter a Tanzanian mobile number, e.g. 0712345678."})
+        with transaction.atomic():
+            # Serializes concurrent submits for the order, so only one payment can start.
+            order = Order.objects.select_for_update().get(pk=order.pk)
+            if order.status == "cancelled":
+                raise ValidationError({"order": "This order was cancelled."})
+            if Payment.objects.filter(order=order, status__in=["pending", "success"]).exists():
+                raise ValidationError({"order": "This order already has a pending or completed payment."})
+            if order.total != order.total.to_integral_value():
+                # Mobile money moves whole shillings only.
+                raise ValidationError({"order": "The order total must be a whole number of shillings."})
+            payment = serializer.save(
+                order=order,
+                amount=order.total,
+                provider=provider,
+                tx_ref=payments.new_tx_ref(),
+                status="pending",
+                payload={"msisdn": phone},
+            )
+            transaction.on_commit(lambda: initiate_payment.delay(str(payment.pk)))
+        data = dict(serializer.data)
+        data["wait_url"] = request.build_absolute_uri(reverse("payment-wait", args=[payment.pk]))
+        return Response(data, status=status.HTTP_202_ACCEPTED)
 
 
 class SellerInvitationViewSet(viewsets.ModelViewSet):
@@ -122,7 +353,7 @@ class SellerInvitationViewSet(viewsets.ModelViewSet):
         user = self.request.user
         if user.role in ("ops_admin",):
             return SellerInvitation.objects.all().select_related("seller", "invited_by")
-        seller_ids = _get_user_seller_memberships(user).values_list("seller_id", flat=True)
+        seller_ids = _user_seller_ids(user)
         return (
             SellerInvitation.objects.filter(seller_id__in=seller_ids)
             .select_related("seller", "invited_by")
@@ -148,9 +379,35 @@ class SellerInvitationViewSet(viewsets.ModelViewSet):
             status=SellerInvitation.STATUS_PENDING,
         ).exists():
             raise ValidationError("An invitation has already been sent to that phone number.")
-        serializer.save(
-            seller=membership.seller,
-            invited_by=self.request.user,
+        with transaction.atomic():
+            invitation = serializer.save(
+                seller=membership.seller,
+                invited_by=self.request.user,
+            )
+            outbox.notify_invitation(invitation)
+
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def bulk(self, request):
+        """
+        Invite many team members at once: a JSON list of {email, phone, role}
+        or a CSV upload in ``file``. Returns a result for every row.
+        """
+        membership = (
+            _get_user_seller_memberships(request.user)
+            .filter(role=SellerUser.ROLE_ADMIN)
+            .first()
+        )
+        if not membership:
+            raise ValidationError("Only seller admins can invite team members.")
+        try:
+            rows = invitations.read_rows(request.data, request.FILES.get("file"))
+        except invitations.BulkInvitationError as exc:
+            raise ValidationError(str(exc))
+        results = invitations.bulk_invite(membership.seller, request.user, rows)
+        created = sum(1 for result in results if result["status"] == "created")
+        return Response(
+            {"created": created, "skipped": len(results) - created, "results": results},
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
         )
 
     @action(detail=True, methods=["post"])
@@ -252,8 +509,37 @@ class SellerInvitationViewSet(viewsets.ModelViewSet):
         tokens = tokens_for_user(user)
         return Response({"user": UserSerializer(user).data, "tokens": tokens})
 
+@api_view(["POST"])
+@permission_classes([permissions.IsAuthenticated])
+def shipping_quote(request):
+    """
+    Price delivery of a whole cart, across sellers, to one address.
+    Expects {"delivery_address": {"lat", "lng"}, "items": [{"product_id", "quantity"}]}.
+    """
+    lines = request.data.get("items") or []
+    quantities = defaultdict(int)
+    try:
+        for line in lines:
+            quantities[str(uuid.UUID(str(line["product_id"])))] += int(line["quantity"])
+    except (KeyError, TypeError, ValueError):
+        raise ValidationError("Each item needs a valid product_id and quantity.")
+    products = Product.objects.filter(id__in=quantities.keys()).only("id", "seller_id", "weight_kg")
+    weights = shipping.cart_weights((p, quantities[str(p.id)]) for p in products)
+    if not weights:
+        raise ValidationError("No known products in cart.")
+    try:
+        result = shipping.quote(request.data.get("delivery_address"), weights)
+    except shipping.ShippingUnavailable as exc:
+        return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    total = sum(q["shipping_fee"] for q in result["quotes"])
+    for q in result["quotes"]:
+        q["shipping_fee"] = str(q["shipping_fee"])
+    result["shipping_total"] = str(total)
+    return Response(result)
+
 @api_view(["POST"])
 @permission_classes([permissions.AllowAny])  # PSP will call this
+@throttle_classes([WebhookThrottle])
 def payment_webhook(request):
     """
     Expect payload with tx_ref, status, amount, provider.
@@ -267,11 +553,11 @@ def payment_webhook(request):
         payment.status = "success" if status_str == "success" else "failed"
         payment.payload = data
         payment.save()
+        publish_payment_event(payment)
+        payments.publish_resolution(payment)
         # mark order
         if payment.status == "success":
-            order = payment.order
-            order.status = "confirmed"
-            order.save()
+            change_status(payment.order, "confirmed")
         return Response({"ok": True})
     except Payment.DoesNotExist:
         return Response({"ok": False, "error": "Payment not found"}, status=404)
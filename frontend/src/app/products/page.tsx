@@ -1,17 +1,22 @@
 import { ProductsCatalogue } from "@/components/ProductsCatalogue";
 import { ProductsError } from "@/components/ProductsError";
 import { ProductsHero, ProductsOverviewHeader } from "@/components/ProductsHero";
-import { fetchProducts } from "@/lib/api";
-import type { Product } from "@/lib/types";
+import { ProductsPager } from "@/components/ProductsPager";
+import { fetchProducts, type CataloguePage } from "@/lib/api";
 
 export const revalidate = 60;
 
-export default async function ProductsPage() {
-  let products: Product[] = [];
+type ProductsPageProps = {
+  searchParams: Promise<{ page?: string }>;
+};
+
+export default async function ProductsPage({ searchParams }: ProductsPageProps) {
+  const page = Number.parseInt((await searchParams).page ?? "1", 10) || 1;
+  let catalogue: CataloguePage = { products: [], page: 1, pages: 1 };
   let errorMessage: string | null = null;
 
   try {
-    products = await fetchProducts({ revalidate: 60 });
+    catalogue = await fetchProducts({ revalidate: 60, page });
   } catch (error) {
     errorMessage =
       error instanceof Error
@@ -28,7 +33,8 @@ export default async function ProductsPage() {
       <ProductsHero />
       <section id="catalogue" className="space-y-6">
         <ProductsOverviewHeader />
-        <ProductsCatalogue products={products} />
+        <ProductsCatalogue products={catalogue.products} />
+        <ProductsPager page={catalogue.page} pages={catalogue.pages} />
       </section>
     </div>
   );
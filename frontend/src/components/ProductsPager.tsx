@@ -0,0 +1,36 @@
+"use client";
+
+import Link from "next/link";
+import { useLocale } from "@/context/LocaleContext";
+
+type ProductsPagerProps = {
+  page: number;
+  pages: number;
+};
+
+const linkClass =
+  "rounded-full border border-[color:var(--border-muted)] px-4 py-2 text-xs font-semibold uppercase tracking-wide text-muted transition hover:bg-brand-soft";
+
+export function ProductsPager({ page, pages }: ProductsPagerProps) {
+  const { t } = useLocale();
+
+  if (pages <= 1) {
+    return null;
+  }
+
+  return (
+    <nav className="flex items-center justify-center gap-4">
+      {page > 1 ? (
+        <Link href={`/products?page=${page - 1}#catalogue`} className={linkClass}>
+          {t("catalogue_page_previous")}
+        </Link>
+      ) : null}
+      <span className="text-xs text-muted">{t("catalogue_page_status", { page, pages })}</span>
+      {page < pages ? (
+        <Link href={`/products?page=${page + 1}#catalogue`} className={linkClass}>
+          {t("catalogue_page_next")}
+        </Link>
+      ) : null}
+    </nav>
+  );
+}
@@ -162,6 +162,9 @@ export const messages: Record<Locale, Record<string, string>> = {
     catalogue_stats_value: "Inventory value",
     catalogue_stats_avg_price: "Average unit price",
     catalogue_stats_items: "{count} items",
+    catalogue_page_previous: "Previous",
+    catalogue_page_next: "Next",
+    catalogue_page_status: "Page {page} of {pages}",
     products_page_badge: "Catalogue",
     products_page_title: "LMGa materials catalogue",
     products_error_generic: "Something went wrong while loading products.",
@@ -686,6 +689,9 @@ export const messages: Record<Locale, Record<string, string>> = {
     catalogue_stats_value: "Thamani ya hifadhi",
     catalogue_stats_avg_price: "Bei ya wastani kwa kitengo",
     catalogue_stats_items: "Bidhaa {count}",
+    catalogue_page_previous: "Iliyotangulia",
+    catalogue_page_next: "Inayofuata",
+    catalogue_page_status: "Ukurasa {page} kati ya {pages}",
     products_page_badge: "Orodha",
     products_page_title: "Orodha ya vifaa vya LMGa",
     products_error_generic: "Kuna tatizo wakati wa kupakia bidhaa.",
@@ -124,7 +124,71 @@ export async function refreshAccessToken(
   return response.json();
 }
 
-export async function fetchProducts(options?: { revalidate?: number }): Promise<Product[]> {
+// Static catalogue snapshots published by Django (publish_catalogue); when set,
+// anonymous catalogue reads go to object storage instead of the API.
+const catalogueSnapshotBase = process.env.NEXT_PUBLIC_CATALOGUE_SNAPSHOT_URL?.replace(/\/$/, "");
+
+type CatalogueManifest = {
+  version: number;
+  all?: { count: number; pages: string[] };
+  categories: Record<string, { count: number; pages: string[] }>;
+  sellers: Record<string, { business_name: string; count: number; pages: string[] }>;
+  products: Record<string, string>;
+};
+
+async function snapshotRequest<T>(key: string, revalidate?: number): Promise<T> {
+  const isServer = typeof window === "undefined";
+  const response = await fetch(`${catalogueSnapshotBase}/${key}`, {
+    ...(isServer && revalidate !== undefined ? { next: { revalidate } } : {}),
+  });
+  if (!response.ok) {
+    throw new Error(`Snapshot ${key} failed (${response.status})`);
+  }
+  return response.json();
+}
+
+export type CataloguePage = {
+  products: Product[];
+  page: number;
+  pages: number;
+};
+
+async function fetchSnapshotProducts(page: number, revalidate?: number): Promise<CataloguePage> {
+  const manifest = await snapshotRequest<CatalogueManifest>("manifest.json", revalidate);
+  if (!manifest.all) {
+    throw new Error("Snapshot has no catalogue pages.");
+  }
+  const pages = manifest.all.pages;
+  if (pages.length === 0) {
+    return { products: [], page: 1, pages: 1 };
+  }
+  const current = Math.min(Math.max(page, 1), pages.length);
+  // Page files are immutable (content-hashed keys), so only the manifest needs revalidating.
+  const document = await snapshotRequest<{ products: Product[] }>(pages[current - 1]);
+  return { products: document.products, page: current, pages: pages.length };
+}
+
+async function fetchSnapshotProduct(id: string, revalidate?: number): Promise<Product> {
+  const manifest = await snapshotRequest<CatalogueManifest>("manifest.json", revalidate);
+  const bucket = manifest.products[id.replace(/-/g, "").slice(0, 2)];
+  const index = bucket ? await snapshotRequest<Record<string, string>>(bucket) : {};
+  if (!index[id]) {
+    throw new Error("Product not found.");
+  }
+  return snapshotRequest<Product>(index[id]);
+}
+
+export async function fetchProducts(options?: {
+  revalidate?: number;
+  page?: number;
+}): Promise<CataloguePage> {
+  if (catalogueSnapshotBase) {
+    try {
+      return await fetchSnapshotProducts(options?.page ?? 1, options?.revalidate);
+    } catch {
+      /* fall back to the API */
+    }
+  }
   const isServer = typeof window === "undefined";
   const next =
     isServer && options?.revalidate !== undefined
@@ -136,13 +200,21 @@ export async function fetchProducts(options?: { revalidate?: number }): Promise<
   });
 
   const data: DRFListResponse<Product> | Product[] = await response.json();
-  return Array.isArray(data) ? data : data.results ?? [];
+  // The API isn't paginated, so it answers as a single page.
+  return { products: Array.isArray(data) ? data : data.results ?? [], page: 1, pages: 1 };
 }
 
 export async function fetchProductById(
   id: string,
   options?: { revalidate?: number },
 ): Promise<Product> {
+  if (catalogueSnapshotBase) {
+    try {
+      return await fetchSnapshotProduct(id, options?.revalidate);
+    } catch {
+      /* fall back to the API */
+    }
+  }
   const isServer = typeof window === "undefined";
   const next =
     isServer && options?.revalidate !== undefined